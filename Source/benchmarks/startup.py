@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('pandas', 'matplotlib', 'reportlab', 'numpy')
+
+# Budgets in milliseconds; a release is blocked when a median exceeds them
+# or when any of HEAVY_MODULES is loaded before the first window
+DEFAULT_BUDGETS = {
+    'cli_import_ms': 150,
+    'gui_import_ms': 600,
+    'first_window_ms': 1500
+}
+
+
+def probe_import(module: str) -> Dict:
+    start = time.perf_counter()
+    __import__(module)
+    elapsed = (time.perf_counter() - start) * 1000
+    return {
+        'elapsed_ms': elapsed,
+        'heavy_modules': [name for name in HEAVY_MODULES if name in sys.modules]
+    }
+
+
+def probe_window() -> Dict:
+    start = time.perf_counter()
+    from tkinterdnd2 import TkinterDnD
+    from src.gui.app import ImageCompressor
+
+    root = TkinterDnD.Tk()
+    ImageCompressor(root)
+    while not root.winfo_viewable():
+        root.update()
+    elapsed = (time.perf_counter() - start) * 1000
+    root.destroy()
+    return {
+        'elapsed_ms': elapsed,
+        'heavy_modules': [name for name in HEAVY_MODULES if name in sys.modules]
+    }
+
+
+def run_probe(args: List[str]) -> Optional[Dict]:
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--probe'] + args,
+        cwd=SOURCE_DIR,
+        capture_output=True,
+        text=True
+    )
+    wall = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1:] or ['unknown error']
+        print(f"Probe {' '.join(args)} failed: {error[0]}", file=sys.stderr)
+        return None
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    data['process_ms'] = wall
+    return data
+
+
+def measure(name: str, args: List[str], repeat: int) -> Optional[Dict]:
+    samples = []
+    for _ in range(repeat):
+        data = run_probe(args)
+        if data is None:
+            return None
+        samples.append(data)
+
+    elapsed = sorted(sample['elapsed_ms'] for sample in samples)
+    process = sorted(sample['process_ms'] for sample in samples)
+    return {
+        'name': name,
+        'median_ms': elapsed[len(elapsed) // 2],
+        'min_ms': elapsed[0],
+        'max_ms': elapsed[-1],
+        'median_process_ms': process[len(process) // 2],
+        'heavy_modules': samples[-1]['heavy_modules']
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure QuickPress startup time.")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per measurement (default: 5)")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--budget', action='append', default=[], metavar='NAME=MS',
+                        help="override a budget, e.g. first_window_ms=1000")
+    parser.add_argument('--no-window', action='store_true',
+                        help="skip the time-to-first-window probe (needed on machines without a display)")
+    parser.add_argument('--probe', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.probe:
+        sys.path.insert(0, SOURCE_DIR)
+        kind = args.probe[0]
+        data = probe_window() if kind == 'window' else probe_import(args.probe[1])
+        print(json.dumps(data))
+        return 0
+
+    budgets = dict(DEFAULT_BUDGETS)
+    for item in args.budget:
+        name, value = item.split('=', 1)
+        budgets[name] = float(value)
+
+    scenarios = [
+        ('cli_import_ms', ['import', 'src.cli']),
+        ('gui_import_ms', ['import', 'src.gui.app'])
+    ]
+    if not args.no_window:
+        scenarios.append(('first_window_ms', ['window']))
+
+    results = []
+    failed = []
+    over_budget = False
+    for name, probe_args in scenarios:
+        result = measure(name, probe_args, args.repeat)
+        if result is None:
+            # A probe that cannot run measured nothing, so it must not pass the gate
+            failed.append(name)
+            print(f"{name:<18} [FAILED]")
+            continue
+        result['budget_ms'] = budgets.get(name)
+        result['within_budget'] = (
+            (result['budget_ms'] is None or result['median_ms'] <= result['budget_ms'])
+            and not result['heavy_modules']
+        )
+        over_budget = over_budget or not result['within_budget']
+        results.append(result)
+
+        status = "ok" if result['within_budget'] else "OVER BUDGET"
+        heavy = ', '.join(result['heavy_modules']) or 'none'
+        print(
+            f"{name:<18} median {result['median_ms']:8.1f} ms "
+            f"(process {result['median_process_ms']:8.1f} ms, budget {result['budget_ms']} ms) "
+            f"heavy modules: {heavy} [{status}]"
+        )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(
+                {'python': sys.version, 'platform': sys.platform, 'results': results, 'failed': failed},
+                f,
+                indent=2
+            )
+
+    if 'first_window_ms' in failed:
+        print("Use --no-window to skip the window probe on machines without a display", file=sys.stderr)
+    return 1 if over_budget or failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
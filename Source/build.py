@@ -22,8 +22,8 @@ def build_executable():
         '--hidden-import=PIL',
         '--hidden-import=PIL.Image',
         '--hidden-import=matplotlib',
+        '--hidden-import=matplotlib.backends.backend_agg',
         '--hidden-import=numpy',
-        '--hidden-import=pandas',
         '--hidden-import=reportlab'
     ])
 
@@ -0,0 +1,203 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from typing import Iterator, List, Optional, Union
+
+from src.core.batch import BatchCompressor
+from src.core.cache import ResultCache
+from src.core.compressor import ImageCompressor
+from src.core.duplicates import DuplicateFinder
+from src.core.file_handler import FileHandler
+from src.core.perceptual import PerceptualGuard
+from src.core.png import PngOptimizer
+from src.utils.metrics import MetricsRegistry
+
+
+def parse_quality(value: str) -> int:
+    if value.lower() in ImageCompressor.QUALITY_LEVELS:
+        return ImageCompressor.QUALITY_LEVELS[value.lower()]
+    try:
+        quality = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"quality must be one of {', '.join(ImageCompressor.QUALITY_LEVELS)} or an integer 1-95"
+        )
+    if not 1 <= quality <= 95:
+        raise argparse.ArgumentTypeError("quality must be between 1 and 95")
+    return quality
+
+
+def parse_scale(value: str) -> float:
+    try:
+        scale = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("scale must be a number between 0 and 1")
+    if not 0 < scale <= 1:
+        raise argparse.ArgumentTypeError("scale must be greater than 0 and at most 1")
+    return scale
+
+
+def parse_dimension(value: str) -> int:
+    try:
+        dimension = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("max dimension must be a whole number of pixels")
+    if dimension < 1:
+        raise argparse.ArgumentTypeError("max dimension must be at least 1 pixel")
+    return dimension
+
+
+def parse_colors(value: str) -> int:
+    try:
+        colors = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("PNG colours must be a whole number between 2 and 256")
+    if not PngOptimizer.MIN_COLORS <= colors <= PngOptimizer.MAX_COLORS:
+        raise argparse.ArgumentTypeError("PNG colours must be between 2 and 256")
+    return colors
+
+
+def parse_ssim(value: str) -> float:
+    try:
+        ssim = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("SSIM must be a number between 0 and 1")
+    if not 0 < ssim < 1:
+        raise argparse.ArgumentTypeError("SSIM must be greater than 0 and less than 1")
+    return ssim
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="quickpress",
+        description="Compress images without starting the QuickPress window."
+    )
+    parser.add_argument("inputs", nargs="+", help="image files or folders to compress")
+    parser.add_argument("-q", "--quality", type=parse_quality, default=None,
+                        help="high, medium, low or an integer 1-95; with --min-ssim, the highest quality "
+                             f"allowed (default: medium, or {ImageCompressor.MAX_QUALITY} with --min-ssim)")
+    parser.add_argument("-f", "--format", dest="output_format", choices=["same", "JPEG", "PNG", "WEBP", ImageCompressor.SMALLEST],
+                        default="same",
+                        help="output format; smallest keeps whichever of JPEG, WebP and PNG is smallest (default: same)")
+    sizes = parser.add_mutually_exclusive_group()
+    sizes.add_argument("-t", "--target-size", type=float, default=None,
+                       help="target size per image in MB")
+    sizes.add_argument("--total-size", type=float, default=None, metavar="MB",
+                       help="fit the whole batch into this many MB, lowering quality where it costs least")
+    sizes.add_argument("--min-ssim", type=parse_ssim, nargs="?", const=PerceptualGuard.DEFAULT_MIN_SSIM,
+                       default=None, metavar="SSIM",
+                       help="use the lowest quality whose output keeps this luma SSIM with the original, "
+                            "reported as quality and ssim in each result; applies to JPEG and WebP, PNG stays "
+                            f"lossless (default when given without a value: {PerceptualGuard.DEFAULT_MIN_SSIM})")
+    parser.add_argument("--probes", type=int, default=1, metavar="N",
+                        help="with --target-size or --total-size, encode N candidate qualities of each image "
+                             "at once on threads, at most one per CPU core; speeds up large images when cores are left over "
+                             "(default: 1)")
+    parser.add_argument("--png-colors", type=parse_colors, default=None, metavar="N",
+                        help="quantize PNG output to a palette of at most N colours (lossy; "
+                             "by default PNG output is lossless)")
+    parser.add_argument("--max-dimension", type=parse_dimension, default=None, metavar="PX",
+                        help="shrink images so their longer edge is at most PX pixels")
+    parser.add_argument("--scale", type=parse_scale, default=None, metavar="FACTOR",
+                        help="shrink images by FACTOR (0-1, e.g. 0.5 for half size)")
+    parser.add_argument("--dedupe", nargs="?", choices=DuplicateFinder.MODES, const=DuplicateFinder.EXACT, default=None,
+                        help="compress identical images once and copy the output for the others; "
+                             "similar also groups re-saved copies with the same size and format, whose outputs "
+                             "then hold the first copy's pixels (marked pixels_from) (default: exact)")
+    parser.add_argument("-o", "--output", default="",
+                        help="output folder (default: next to each input file)")
+    parser.add_argument("--no-overwrite", dest="overwrite", action="store_false",
+                        help="keep existing outputs and number new ones instead (name_compressed_1.jpg, ...)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("--memory-limit", type=float, default=None, metavar="MB",
+                        help="RAM budget for images being decoded at once (default: half of physical memory)")
+    parser.add_argument("--cache", nargs="?", const=ResultCache.default_dir(), default=None, metavar="DIR",
+                        help="reuse results for unchanged images, stored in DIR "
+                             f"(default: {ResultCache.default_dir()})")
+    parser.add_argument("--cache-size", type=float, default=None, metavar="MB",
+                        help=f"maximum cache size in MB (default: {ResultCache.DEFAULT_MAX_BYTES // (1024 * 1024)})")
+    parser.add_argument("--profile", action="store_true",
+                        help="include per-stage timings and search iteration counts in each result")
+    parser.add_argument("--metrics", default=None, metavar="FILE",
+                        help="write aggregated counters and stage latency histograms to FILE "
+                             "(JSON, or Prometheus text when FILE ends in .prom)")
+    return parser
+
+
+def collect_files(inputs: List[str]) -> Iterator[Union[str, os.DirEntry]]:
+    for path in inputs:
+        if os.path.isdir(path):
+            # Entries carry the stat taken while scanning, so files are not stat'ed again
+            yield from FileHandler.scan_folder(path)
+        elif FileHandler.validate_file(path):
+            yield path
+        else:
+            print(f"Skipping {path}: not a valid image or folder", file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+
+    if args.quality is None:
+        args.quality = ImageCompressor.MAX_QUALITY if args.min_ssim else ImageCompressor.QUALITY_LEVELS['medium']
+    target_size = args.target_size * 1024 * 1024 if args.target_size else None
+    memory_limit = int(args.memory_limit * 1024 * 1024) if args.memory_limit else None
+    batch = BatchCompressor(args.workers, memory_limit=memory_limit)
+    metrics = MetricsRegistry() if args.profile or args.metrics else None
+
+    failed = 0
+    options = dict(
+        output_folder=args.output,
+        quality=args.quality,
+        output_format=args.output_format,
+        ordered=False,
+        cache_dir=args.cache,
+        cache_max_bytes=int(args.cache_size * 1024 * 1024) if args.cache_size else None,
+        metrics=metrics,
+        overwrite=args.overwrite,
+        max_dimension=args.max_dimension,
+        scale=args.scale,
+        probes=max(1, args.probes),
+        dedupe=args.dedupe,
+        png_colors=args.png_colors
+    )
+    if args.total_size:
+        try:
+            results = batch.compress_to_budget(
+                collect_files(args.inputs), total_size=args.total_size * 1024 * 1024, **options
+            )
+        except Exception as e:
+            print(f"quickpress: {str(e)}", file=sys.stderr)
+            return 1
+    else:
+        results = batch.compress(collect_files(args.inputs), target_size=target_size, min_ssim=args.min_ssim, **options)
+    for stat in results:
+        if BatchCompressor.is_error(stat):
+            failed += 1
+        elif stat.get('ssim_met') is False:
+            print(
+                f"quickpress: {stat['file']} only reached SSIM {stat['ssim']:.4f} at quality {stat['quality']}, "
+                f"below --min-ssim",
+                file=sys.stderr
+            )
+        if not args.profile:
+            # --metrics profiles too, but stdout keeps the same schema either way
+            stat = {key: value for key, value in stat.items() if key not in ImageCompressor.PROFILE_KEYS}
+        sys.stdout.write(json.dumps(stat) + "\n")
+        sys.stdout.flush()
+
+    if args.metrics:
+        metrics.dump(args.metrics)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,208 @@
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from src.core.budget import BudgetAllocator
+from src.core.compressor import ImageCompressor
+from src.core.control import JobControl
+from src.core.duplicates import DuplicateFinder
+from src.core.fileio import FileIO
+from src.core.pipeline import CompressionPipeline
+from src.utils.metrics import MetricsRegistry
+
+
+class BatchCompressor:
+    # ProcessPoolExecutor refuses more than 61 workers on Windows
+    MAX_WINDOWS_WORKERS = 61
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        io_threads: int = CompressionPipeline.IO_THREADS,
+        memory_limit: Optional[int] = None
+    ):
+        workers = workers or os.cpu_count() or 1
+        if os.name == 'nt':
+            workers = min(workers, BatchCompressor.MAX_WINDOWS_WORKERS)
+        self.workers = max(1, workers)
+        self.io_threads = io_threads
+        self.memory_limit = memory_limit
+
+    def compress(
+        self,
+        files: Iterable[Union[str, os.PathLike]],
+        output_folder: str,
+        quality: int,
+        output_format: str,
+        target_size: Optional[float] = None,
+        ordered: bool = True,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: Optional[int] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        overwrite: bool = True,
+        max_dimension: Optional[int] = None,
+        scale: Optional[float] = None,
+        control: Optional[JobControl] = None,
+        probes: int = 1,
+        min_ssim: Optional[float] = None,
+        dedupe: Optional[str] = None,
+        png_colors: Optional[int] = None
+    ) -> Iterator[Dict]:
+        # With dedupe, each duplicate's stat follows its representative's, even when ordered
+        files, duplicates = self._deduplicate(files, dedupe, control)
+        pipeline = CompressionPipeline(self.workers, self.io_threads, memory_limit=self.memory_limit)
+        results = pipeline.run(
+            files,
+            output_folder=output_folder,
+            quality=quality,
+            output_format=output_format,
+            target_size=target_size,
+            ordered=ordered,
+            cache_dir=cache_dir,
+            cache_max_bytes=cache_max_bytes,
+            metrics=metrics,
+            overwrite=overwrite,
+            max_dimension=max_dimension,
+            scale=scale,
+            control=control,
+            probes=probes,
+            min_ssim=min_ssim,
+            png_colors=png_colors
+        )
+        return BatchCompressor.copy_duplicates(results, duplicates, output_folder, overwrite, metrics)
+    
+    def compress_to_budget(
+        self,
+        files: Iterable[Union[str, os.PathLike]],
+        output_folder: str,
+        quality: int,
+        output_format: str,
+        total_size: float,
+        ordered: bool = True,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: Optional[int] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        overwrite: bool = True,
+        max_dimension: Optional[int] = None,
+        scale: Optional[float] = None,
+        control: Optional[JobControl] = None,
+        probes: int = 1,
+        dedupe: Optional[str] = None,
+        png_colors: Optional[int] = None
+    ) -> Iterator[Dict]:
+        # quality caps every image; the planner only ever lowers it to fit total_size.
+        # Duplicates get a copy of their representative's output (a reflink where the filesystem
+        # shares blocks), so only representatives are planned
+        files, duplicates = self._deduplicate(list(files), dedupe, control)
+        targets = BudgetAllocator(self.workers).plan(
+            [os.fspath(file_path) for file_path in files], total_size, output_format, quality, max_dimension, scale,
+            png_colors, control
+        )
+        pipeline = CompressionPipeline(self.workers, self.io_threads, memory_limit=self.memory_limit)
+        results = pipeline.run(
+            files,
+            output_folder=output_folder,
+            quality=quality,
+            output_format=output_format,
+            ordered=ordered,
+            cache_dir=cache_dir,
+            cache_max_bytes=cache_max_bytes,
+            metrics=metrics,
+            targets=targets,
+            overwrite=overwrite,
+            max_dimension=max_dimension,
+            scale=scale,
+            control=control,
+            probes=probes,
+            png_colors=png_colors
+        )
+        return BatchCompressor.copy_duplicates(results, duplicates, output_folder, overwrite, metrics)
+
+    def _deduplicate(
+        self,
+        files: Iterable[Union[str, os.PathLike]],
+        dedupe: Optional[str],
+        control: Optional[JobControl] = None
+    ) -> Tuple[Iterable[Union[str, os.PathLike]], Dict[str, List[Tuple[str, str]]]]:
+        if not dedupe:
+            return files, {}
+        return DuplicateFinder.find(list(files), dedupe, max(self.workers, self.io_threads), control)
+
+    @staticmethod
+    def copy_duplicates(
+        results: Iterator[Dict],
+        duplicates: Dict[str, List[Tuple[str, str]]],
+        output_folder: str,
+        overwrite: bool = True,
+        metrics: Optional[MetricsRegistry] = None
+    ) -> Iterator[Dict]:
+        if not duplicates:
+            return results
+        return BatchCompressor._expand_duplicates(results, duplicates, output_folder, overwrite, metrics)
+
+    @staticmethod
+    def _expand_duplicates(
+        results: Iterator[Dict],
+        duplicates: Dict[str, List[Tuple[str, str]]],
+        output_folder: str,
+        overwrite: bool,
+        metrics: Optional[MetricsRegistry]
+    ) -> Iterator[Dict]:
+        groups = {file_path: number for number, file_path in enumerate(duplicates, 1)}
+        for stat in results:
+            representative = stat['file']
+            if representative not in duplicates:
+                yield stat
+                continue
+            if not BatchCompressor.is_error(stat):
+                stat['duplicate_group'] = groups[representative]
+            yield stat
+            for file_path, kind in duplicates[representative]:
+                duplicate = BatchCompressor._copy_duplicate(
+                    stat, file_path, kind, groups[representative], output_folder, overwrite
+                )
+                if metrics:
+                    metrics.record(duplicate)
+                yield duplicate
+
+    @staticmethod
+    def _copy_duplicate(
+        stat: Dict,
+        file_path: str,
+        kind: str,
+        group: int,
+        output_folder: str,
+        overwrite: bool
+    ) -> Dict:
+        representative = stat['file']
+        if BatchCompressor.is_error(stat):
+            return {
+                'file': file_path,
+                'error': f"Error compressing image {file_path}: same image as {representative}, which failed"
+            }
+        try:
+            output_path = ImageCompressor.build_output_path(
+                file_path, output_folder, ImageCompressor.extension_for(stat['format'])
+            )
+            # The same file listed twice already has its output
+            if not (os.path.exists(output_path) and os.path.samefile(stat['output_path'], output_path)):
+                output_path = FileIO.copy_atomic(stat['output_path'], output_path, overwrite)
+            duplicate = {
+                'file': file_path,
+                'original_size': os.path.getsize(file_path),
+                'compressed_size': stat['compressed_size'],
+                'format': stat['format'],
+                'output_path': output_path,
+                'duplicate_of': representative,
+                'duplicate': kind,
+                'duplicate_group': group
+            }
+            if kind == DuplicateFinder.SIMILAR:
+                # A near duplicate's output is the representative's encode, not its own pixels
+                duplicate['pixels_from'] = representative
+            return duplicate
+        except Exception as e:
+            return {'file': file_path, 'error': f"Error compressing image {file_path}: {str(e)}"}
+
+    @staticmethod
+    def is_error(result: Dict) -> bool:
+        return 'error' in result
@@ -0,0 +1,154 @@
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional
+
+from PIL import Image
+
+from src.core.compressor import ImageCompressor
+from src.core.control import JobControl
+
+
+def _profile_job(
+    file_path: str,
+    output_format: str,
+    quality: int,
+    max_dimension: Optional[int] = None,
+    scale: Optional[float] = None,
+    png_colors: Optional[int] = None
+) -> Dict:
+    try:
+        with Image.open(file_path) as img:
+            resolved_format = (img.format or "JPEG") if output_format == "same" else output_format
+            size = ImageCompressor.resized_size(img.size, max_dimension, scale)
+            if size:
+                # Profiled at the size that will actually be encoded
+                img.draft(None, size)
+                img = ImageCompressor.resize(img, size)
+            if resolved_format == ImageCompressor.SMALLEST:
+                # The lossy candidates are searched to the same target, so one curve stands in for them
+                resolved_format = "WEBP"
+            if ImageCompressor.needs_conversion(img.mode, resolved_format):
+                img = img.convert('RGB')
+
+            if resolved_format in ImageCompressor.LOSSY_FORMATS:
+                curve = ImageCompressor.size_curve(img, resolved_format)
+                # The proxy can misjudge a whole image by a wide margin, so one full encode at the
+                # lowest quality rescales its curve. That smallest size is then exact, and a target
+                # at or above it is always met by the quality search
+                floor = ImageCompressor.encode(img, resolved_format, ImageCompressor.MIN_QUALITY).getbuffer().nbytes
+                scale = floor / ImageCompressor._curve_size(curve, ImageCompressor.MIN_QUALITY)
+                sizes = [max(float(floor), size * scale) for size in ImageCompressor.predict_sizes(curve)]
+                return {'file': file_path, 'sizes': sizes}
+
+            # Lossless sizes swing too far with content for a proxy to stand in (a noisy image
+            # can be thousands of times its estimate), and nothing can be traded back for them,
+            # so formats without a quality are encoded in full
+            size = ImageCompressor.encode(img, resolved_format, quality, png_colors).getbuffer().nbytes
+            return {'file': file_path, 'fixed_size': float(size)}
+    except Exception as e:
+        return {'file': file_path, 'error': str(e)}
+
+
+class BudgetAllocator:
+    # A whole batch is fitted to one byte budget: every image's size/quality
+    # curve is estimated from a proxy encode and calibrated by one full encode,
+    # and formats without a quality are encoded in full. Qualities are then
+    # chosen to keep the summed quality as high as possible while the predicted
+    # total fits. A budget that even the lowest quality cannot meet is refused
+    # rather than quietly exceeded
+    BISECTION_STEPS = 60
+    # Files are handed to the pool a few at a time, so a pause or cancel takes
+    # effect between files instead of after the whole batch is profiled
+    IN_FLIGHT_PER_WORKER = 2
+
+    def __init__(self, workers: int = 1):
+        self.workers = max(1, workers)
+
+    def profile(
+        self,
+        files: Iterable[str],
+        output_format: str,
+        quality: int,
+        max_dimension: Optional[int] = None,
+        scale: Optional[float] = None,
+        png_colors: Optional[int] = None,
+        control: Optional[JobControl] = None
+    ) -> List[Dict]:
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            executor = ThreadPoolExecutor(max_workers=1)
+        futures = []
+        pending = set()
+        with executor:
+            for file_path in files:
+                if len(pending) >= self.workers * BudgetAllocator.IN_FLIGHT_PER_WORKER:
+                    _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                if control and not control.wait():
+                    break
+                future = executor.submit(
+                    _profile_job, file_path, output_format, quality, max_dimension, scale, png_colors
+                )
+                futures.append(future)
+                pending.add(future)
+        return [future.result() for future in futures]
+
+    def plan(
+        self,
+        files: Iterable[str],
+        budget_bytes: float,
+        output_format: str,
+        max_quality: int,
+        max_dimension: Optional[int] = None,
+        scale: Optional[float] = None,
+        png_colors: Optional[int] = None,
+        control: Optional[JobControl] = None
+    ) -> Dict[str, float]:
+        profiles = self.profile(files, output_format, max_quality, max_dimension, scale, png_colors, control)
+        if control and control.cancelled:
+            # Nothing will be compressed, and a partial profile cannot be judged against the budget
+            return {}
+        return BudgetAllocator.allocate(profiles, budget_bytes, max_quality)
+
+    @staticmethod
+    def allocate(profiles: List[Dict], budget_bytes: float, max_quality: int) -> Dict[str, float]:
+        import numpy as np
+
+        lossy = [profile for profile in profiles if 'sizes' in profile]
+        fixed = sum(profile.get('fixed_size', 0) for profile in profiles)
+        smallest = fixed + sum(profile['sizes'][0] for profile in lossy)
+        if smallest > budget_bytes:
+            raise Exception(
+                f"Error planning batch size: the images need about {smallest / (1024 * 1024):.2f} MB even at the "
+                f"lowest quality, more than the {budget_bytes / (1024 * 1024):.2f} MB allowed"
+            )
+        if not lossy:
+            return {}
+
+        qualities = np.arange(ImageCompressor.MIN_QUALITY, ImageCompressor.MAX_QUALITY + 1)
+        allowed = qualities <= max(ImageCompressor.MIN_QUALITY, max_quality)
+        sizes = np.array([profile['sizes'] for profile in lossy])[:, allowed]
+        qualities = qualities[allowed]
+        remaining = budget_bytes - fixed
+        rows = np.arange(len(lossy))
+
+        def choose(weight: float):
+            # Per image, the quality that best trades quality points against bytes at this weight
+            return np.argmax(qualities[None, :] - weight * sizes, axis=1)
+
+        choice = np.full(len(lossy), len(qualities) - 1)
+        if sizes[rows, choice].sum() > remaining:
+            # The lowest quality fits (checked above); bisect the bytes-per-quality-point
+            # weight on a log scale until the total just fits
+            choice = np.zeros(len(lossy), dtype=int)
+            low, high = -30.0, 5.0
+            for _ in range(BudgetAllocator.BISECTION_STEPS):
+                middle = (low + high) / 2
+                candidate = choose(10 ** middle)
+                if sizes[rows, candidate].sum() <= remaining:
+                    high = middle
+                    choice = candidate
+                else:
+                    low = middle
+
+        return {profile['file']: float(sizes[index, choice[index]]) for index, profile in enumerate(lossy)}
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from src.core.fileio import FileIO
+
+
+class ResultCache:
+    # Bump when encoder output changes so stale results are not reused
+    VERSION = 5
+    DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+    HASH_CHUNK_SIZE = 1024 * 1024
+    EVICT_TO_RATIO = 0.9
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or ResultCache.default_dir()
+        self.max_bytes = max_bytes or ResultCache.DEFAULT_MAX_BYTES
+        self.blob_dir = os.path.join(self.cache_dir, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(self.cache_dir, "index.sqlite3"),
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                digest TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                blob TEXT NOT NULL,
+                original_size INTEGER NOT NULL,
+                compressed_size INTEGER NOT NULL,
+                format TEXT NOT NULL,
+                extension TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                extra TEXT
+            );
+            CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+            CREATE TABLE IF NOT EXISTS usage (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                bytes INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO usage (id, bytes)
+                SELECT 0, COALESCE(SUM(compressed_size), 0) FROM results;
+            CREATE TRIGGER IF NOT EXISTS results_added AFTER INSERT ON results BEGIN
+                UPDATE usage SET bytes = bytes + NEW.compressed_size WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS results_removed AFTER DELETE ON results BEGIN
+                UPDATE usage SET bytes = bytes - OLD.compressed_size WHERE id = 0;
+            END;
+        """)
+        if 'extra' not in {row[1] for row in self._db.execute("PRAGMA table_info(results)")}:
+            try:
+                self._db.execute("ALTER TABLE results ADD COLUMN extra TEXT")
+            except sqlite3.OperationalError:
+                # Another process sharing the cache added it first
+                pass
+
+    @staticmethod
+    def default_dir() -> str:
+        if os.name == 'nt':
+            base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+            return os.path.join(base, "QuickPress", "cache")
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), ".cache")
+        return os.path.join(base, "quickpress")
+
+    def file_digest(self, file_path: str, stat: Optional[os.stat_result] = None) -> Tuple[str, os.stat_result]:
+        path = os.path.abspath(file_path)
+        stat = stat or os.stat(path)
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest FROM files WHERE path = ? AND mtime_ns = ? AND size = ?",
+                (path, stat.st_mtime_ns, stat.st_size)
+            ).fetchone()
+        if row:
+            return row[0], stat
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(ResultCache.HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (path, mtime_ns, size, digest) VALUES (?, ?, ?, ?)",
+                (path, stat.st_mtime_ns, stat.st_size, digest.hexdigest())
+            )
+        return digest.hexdigest(), stat
+
+    def make_key(self, file_path: str, settings: Dict, stat: Optional[os.stat_result] = None) -> str:
+        digest, _ = self.file_digest(file_path, stat)
+        payload = json.dumps({'version': ResultCache.VERSION, 'settings': settings}, sort_keys=True)
+        return hashlib.sha256(f"{digest}:{payload}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT blob, original_size, compressed_size, format, extension, extra FROM results WHERE key = ?",
+                (key,)
+            ).fetchone()
+        if not row:
+            return None
+
+        blob_path = os.path.join(self.blob_dir, row[0])
+        try:
+            blob_stat = os.stat(blob_path)
+            # Older versions hard-linked outputs to blobs, so a linked blob may have been edited in place
+            if blob_stat.st_size != row[2] or blob_stat.st_nlink > 1:
+                raise OSError("cached result is corrupt")
+        except OSError:
+            self._forget(key, row[0])
+            return None
+
+        with self._lock:
+            self._db.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        return {
+            'blob_path': blob_path,
+            'original_size': row[1],
+            'compressed_size': row[2],
+            'format': row[3],
+            'extension': row[4],
+            'extra': json.loads(row[5]) if row[5] else {}
+        }
+
+    def put(self, key: str, stat: Dict, data=None, extra: Optional[Dict] = None) -> None:
+        # extra holds stat fields that only the encode itself knows, such as the quality a search chose
+        extension = os.path.splitext(stat['output_path'])[1]
+        blob = f"{key}{extension}"
+        blob_path = os.path.join(self.blob_dir, blob)
+
+        # Encoded bytes still in memory are written directly instead of re-reading the output
+        if data is not None:
+            FileIO.write_atomic(blob_path, data)
+        else:
+            temp_path = FileIO.temp_path(blob_path)
+            shutil.copyfile(stat['output_path'], temp_path)
+            os.replace(temp_path, blob_path)
+
+        with self._lock:
+            # Delete and insert rather than REPLACE, which would skip the usage triggers
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._db.execute(
+                    "INSERT INTO results "
+                    "(key, blob, original_size, compressed_size, format, extension, last_used, extra) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, blob, stat['original_size'], stat['compressed_size'],
+                     stat['format'], extension, time.time(), json.dumps(extra) if extra else None)
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        self.evict()
+
+    @staticmethod
+    def materialize(entry: Dict, output_path: str, overwrite: bool = True) -> str:
+        # A copy (or reflink), never a hard link, so editing the output cannot corrupt the cache
+        return FileIO.copy_atomic(entry['blob_path'], output_path, overwrite)
+
+    def evict(self) -> None:
+        with self._lock:
+            # Kept current by triggers, so every process sharing the cache sees the same total
+            total = self._db.execute("SELECT bytes FROM usage WHERE id = 0").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = self._db.execute(
+                "SELECT key, blob, compressed_size FROM results ORDER BY last_used"
+            ).fetchall()
+
+        limit = self.max_bytes * ResultCache.EVICT_TO_RATIO
+        for key, blob, size in rows:
+            if total <= limit:
+                break
+            self._forget(key, blob)
+            total -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            rows = self._db.execute("SELECT key, blob FROM results").fetchall()
+            self._db.execute("DELETE FROM files")
+        for key, blob in rows:
+            self._forget(key, blob)
+
+    def _forget(self, key: str, blob: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+        try:
+            os.remove(os.path.join(self.blob_dir, blob))
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -1,75 +1,639 @@
-from PIL import Image
+from PIL import Image, UnidentifiedImageError
 import io
+import math
 import os
-from typing import Dict, List, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+from src.core.cache import ResultCache
+from src.core.fileio import FileIO
+from src.core.perceptual import PerceptualGuard
+from src.core.png import PngOptimizer
 
 class ImageCompressor:
+    QUALITY_LEVELS = {"high": 90, "medium": 60, "low": 30}
+    LOSSY_FORMATS = ('JPEG', 'WEBP')
+    EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+    ENCODER_OPTIONS = {
+        "JPEG": {"optimize": True},
+        "WEBP": {"method": 4}
+    }
+    MIN_QUALITY = 1
+    MAX_QUALITY = 95
+    # Stat keys filled in only when profiling; the CLI drops them without --profile
+    PROFILE_KEYS = ('timings', 'search_iterations', 'proxy_encodes', 'candidates')
+    # What the SSIM search settled on, reported (and cached) with every result it produced.
+    # ssim_met is False when even the highest allowed quality stays below min_ssim
+    SEARCH_KEYS = ('quality', 'ssim', 'ssim_met')
+    
+    # "smallest" encodes every candidate in parallel and keeps the smallest result.
+    # JPEG is skipped for images with transparency, since it would drop the alpha
+    SMALLEST = "smallest"
+    CANDIDATE_FORMATS = ('JPEG', 'WEBP', 'PNG')
+    
+    # Target-size search: the size/quality curve is sampled on a mosaic of
+    # full-resolution tiles, then calibrated against a few full encodes
+    PROXY_PIXELS = 1024 * 1024
+    PROXY_TILE = 256
+    PROXY_QUALITIES = (10, 30, 50, 70, 85, 95)
+    TARGET_TOLERANCE = 0.03
+    MAX_FULL_ENCODES = 6
+    # First parallel round spreads its probes over a quarter of the quality range
+    PROBE_WINDOW_DIVISOR = 4
+    
+    # Downscaling reduces by whole factors first (in the DCT domain for JPEG),
+    # leaving at most this much shrink for the final resampling filter
+    RESAMPLE_HEADROOM = 2
+    
     @staticmethod
     def compress_image(
         file_path: str,
         output_folder: str,
         quality: int,
         output_format: str,
-        target_size: Optional[float] = None
+        target_size: Optional[float] = None,
+        cache: Optional[ResultCache] = None,
+        profile: bool = False,
+        overwrite: bool = True,
+        max_dimension: Optional[int] = None,
+        scale: Optional[float] = None,
+        probes: int = 1,
+        min_ssim: Optional[float] = None,
+        png_colors: Optional[int] = None
     ) -> Dict:
         try:
-            with Image.open(file_path) as img:
-                original_size = os.path.getsize(file_path)
-                
-                if output_format == "same":
-                    output_format = img.format or "JPEG"
+            # Stage timings in milliseconds and search counters are only collected when asked
+            # for, but the SSIM search's outcome always is
+            details = {} if profile or min_ssim else None
+            start = time.perf_counter()
+            if cache:
+                cache_key = cache.make_key(
+                    file_path,
+                    ImageCompressor.cache_settings(
+                        quality, output_format, target_size, max_dimension, scale, min_ssim, png_colors
+                    )
+                )
+                stat = ImageCompressor.restore_cached(cache, cache_key, file_path, output_folder, overwrite)
+                if stat:
+                    if profile:
+                        ImageCompressor.lap(details, 'cache', start)
+                        stat.update(details)
+                    return stat
                     
-                extension = ".jpg" if output_format == "JPEG" else ".png"
-                output_path = os.path.join(
-                    output_folder or os.path.dirname(file_path),
-                    f"{os.path.splitext(os.path.basename(file_path))[0]}_compressed{extension}"
+            # The size comes from the open handle and the output size from the buffer, not extra stat calls
+            try:
+                with FileIO.open_input(file_path) as (source, original_size):
+                    buffer, output_format = ImageCompressor.encode_file(
+                        source, quality, output_format, target_size, details, max_dimension, scale, probes, min_ssim,
+                        png_colors
+                    )
+            except UnidentifiedImageError:
+                # Pillow names the open file object, not the path
+                raise UnidentifiedImageError(f"cannot identify image file '{file_path}'")
+            write_start = time.perf_counter()
+            stat = ImageCompressor.write_output(
+                file_path, output_folder, original_size, buffer, output_format, overwrite
+            )
+            ImageCompressor.lap(details, 'write', write_start)
+            stat.update(ImageCompressor.search_result(details))
+            
+            if cache:
+                cache.put(cache_key, stat, buffer.getbuffer(), ImageCompressor.search_result(details))
+            if profile:
+                ImageCompressor.lap(details, 'total', start)
+                stat.update(details)
+            return stat
+        except Exception as e:
+            raise Exception(f"Error compressing image {file_path}: {str(e)}")
+    
+    @staticmethod
+    def encode_file(
+        source: Union[str, BinaryIO],
+        quality: int,
+        output_format: str,
+        target_size: Optional[float] = None,
+        details: Optional[Dict] = None,
+        max_dimension: Optional[int] = None,
+        scale: Optional[float] = None,
+        probes: int = 1,
+        min_ssim: Optional[float] = None,
+        png_colors: Optional[int] = None
+    ) -> Tuple[io.BytesIO, str]:
+        start = time.perf_counter()
+        with Image.open(source) as img:
+            if output_format == "same":
+                output_format = img.format or "JPEG"
+            size = ImageCompressor.resized_size(img.size, max_dimension, scale)
+            if size:
+                img.draft(None, size)
+            img.load()
+            start = ImageCompressor.lap(details, 'decode', start)
+            
+            if size:
+                resized = ImageCompressor.resize(img, size)
+                # A JPEG draft may already have decoded at exactly the requested size
+                if resized is not img:
+                    img.close()
+                    img = resized
+                start = ImageCompressor.lap(details, 'resize', start)
+                
+            if output_format == ImageCompressor.SMALLEST:
+                buffer, output_format = ImageCompressor.encode_smallest(
+                    img, quality, target_size, details, probes, min_ssim, png_colors
                 )
+                ImageCompressor.lap(details, 'search' if target_size or min_ssim else 'encode', start)
+                return buffer, output_format
+                
+            if ImageCompressor.needs_conversion(img.mode, output_format):
+                converted = img.convert('RGB')
+                # Drop the decoded original now rather than holding both copies through the encode
+                img.close()
+                img = converted
+                start = ImageCompressor.lap(details, 'convert', start)
                 
-                if output_format == "JPEG" and img.mode in ('RGBA', 'P'):
-                    img = img.convert('RGB')
+            if target_size and output_format in ImageCompressor.LOSSY_FORMATS:
+                quality, buffer = ImageCompressor.search_quality(
+                    img, target_size, output_format, details=details, probes=probes
+                )
+                ImageCompressor.lap(details, 'search', start)
+            elif min_ssim and output_format in ImageCompressor.LOSSY_FORMATS:
+                quality, buffer = ImageCompressor.search_similarity(
+                    img, output_format, min_ssim, quality, details
+                )
+                ImageCompressor.lap(details, 'search', start)
+            else:
+                buffer = ImageCompressor.encode(img, output_format, quality, png_colors)
+                ImageCompressor.lap(details, 'encode', start)
+                
+        return buffer, output_format
+    
+    @staticmethod
+    def candidate_formats(img: Image.Image) -> List[str]:
+        if img.has_transparency_data:
+            return [fmt for fmt in ImageCompressor.CANDIDATE_FORMATS if fmt != "JPEG"]
+        return list(ImageCompressor.CANDIDATE_FORMATS)
+    
+    @staticmethod
+    def encode_smallest(
+        img: Image.Image,
+        quality: int,
+        target_size: Optional[float] = None,
+        details: Optional[Dict] = None,
+        probes: int = 1,
+        min_ssim: Optional[float] = None,
+        png_colors: Optional[int] = None
+    ) -> Tuple[io.BytesIO, str]:
+        candidates = ImageCompressor.candidate_formats(img)
+        
+        def run(index: int, output_format: str) -> Tuple[io.BytesIO, Dict]:
+            # save() stores encoder settings on the image object, so each thread needs its own
+            if ImageCompressor.needs_conversion(img.mode, output_format):
+                source = img.convert('RGB')
+            else:
+                source = img if index == 0 else img.copy()
+            candidate_details = {}
+            if target_size and output_format in ImageCompressor.LOSSY_FORMATS:
+                _, buffer = ImageCompressor.search_quality(
+                    source, target_size, output_format, details=candidate_details, probes=probes
+                )
+            elif min_ssim and output_format in ImageCompressor.LOSSY_FORMATS:
+                _, buffer = ImageCompressor.search_similarity(
+                    source, output_format, min_ssim, quality, candidate_details
+                )
+            else:
+                buffer = ImageCompressor.encode(source, output_format, quality, png_colors)
+            return buffer, candidate_details
+        
+        # Pillow releases the GIL while encoding, so the candidates run side by side
+        with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+            futures = {fmt: executor.submit(run, index, fmt) for index, fmt in enumerate(candidates)}
+        
+        results = {}
+        errors = []
+        for output_format, future in futures.items():
+            try:
+                results[output_format] = future.result()
+            except Exception as e:
+                errors.append(e)
+        if not results:
+            raise errors[0]
+        
+        # A lossy candidate that missed min_ssim only wins when no candidate met it
+        passing = [fmt for fmt in results if results[fmt][1].get('ssim_met', True)]
+        output_format = min(passing or results, key=lambda fmt: results[fmt][0].getbuffer().nbytes)
+        if details is not None:
+            details['candidates'] = {fmt: result[0].getbuffer().nbytes for fmt, result in results.items()}
+            for candidate_details in (result[1] for result in results.values()):
+                for name in ('search_iterations', 'proxy_encodes'):
+                    if name in candidate_details:
+                        details[name] = details.get(name, 0) + candidate_details[name]
+            details.update(ImageCompressor.search_result(results[output_format][1]))
+        return results[output_format][0], output_format
+    
+    @staticmethod
+    def lap(details: Optional[Dict], stage: str, start: float) -> float:
+        now = time.perf_counter()
+        if details is not None:
+            timings = details.setdefault('timings', {})
+            timings[stage] = timings.get(stage, 0.0) + (now - start) * 1000
+        return now
+    
+    @staticmethod
+    def open_image(source: Union[str, BinaryIO], max_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+        img = Image.open(source)
+        if max_size:
+            # JPEG decodes at 1/2, 1/4 or 1/8 scale in the DCT domain; other formats ignore this
+            img.draft(None, max_size)
+        return img
+    
+    @staticmethod
+    def resized_size(
+        size: Tuple[int, int],
+        max_dimension: Optional[int] = None,
+        scale: Optional[float] = None
+    ) -> Optional[Tuple[int, int]]:
+        factor = 1.0
+        if scale:
+            factor = min(factor, scale)
+        if max_dimension:
+            factor = min(factor, max_dimension / max(size))
+        if factor >= 1:
+            return None
+        return (max(1, round(size[0] * factor)), max(1, round(size[1] * factor)))
+    
+    @staticmethod
+    def resize(img: Image.Image, size: Tuple[int, int]) -> Image.Image:
+        # Palette and bilevel images only resample with nearest neighbour
+        if img.mode == 'P':
+            img = img.convert('RGBA' if img.has_transparency_data else 'RGB')
+        elif img.mode == '1':
+            img = img.convert('L')
+        
+        # Box-averaging by a whole factor is far cheaper than filtering at full size
+        factor = min(img.width // size[0], img.height // size[1]) // ImageCompressor.RESAMPLE_HEADROOM
+        if factor > 1:
+            img = img.reduce(factor)
+        if img.size == size:
+            return img
+        return img.resize(size, Image.Resampling.LANCZOS)
+    
+    @staticmethod
+    def needs_conversion(mode: str, output_format: str) -> bool:
+        return output_format == "JPEG" and mode in ('RGBA', 'P')
+    
+    @staticmethod
+    def estimate_memory(size: Tuple[int, int], mode: str, output_format: str, probes: int = 1) -> int:
+        pixels = size[0] * size[1]
+        bytes_per_pixel = ImageCompressor._bytes_per_pixel(mode)
+        if output_format == ImageCompressor.SMALLEST:
+            # One working copy per candidate besides the decoded original
+            bytes_per_pixel += (len(ImageCompressor.CANDIDATE_FORMATS) - 1) * ImageCompressor._bytes_per_pixel('RGB')
+        elif ImageCompressor.needs_conversion(mode, output_format):
+            bytes_per_pixel += ImageCompressor._bytes_per_pixel('RGB')
+        if output_format in ("PNG", ImageCompressor.SMALLEST):
+            # The PNG engine compresses one copy per zlib strategy at once
+            bytes_per_pixel += (len(PngOptimizer.STRATEGIES) - 1) * bytes_per_pixel
+        # One extra byte per pixel covers each running encoder's working and output buffers
+        return pixels * (bytes_per_pixel + ImageCompressor.probe_threads(probes))
+    
+    @staticmethod
+    def probe_threads(probes: int) -> int:
+        # More encodes than cores only queue behind each other and slow the search down
+        return max(1, min(probes, os.cpu_count() or 1))
+    
+    @staticmethod
+    def _bytes_per_pixel(mode: str) -> int:
+        if mode in ('1', 'L', 'P'):
+            return 1
+        if mode.startswith('I;16'):
+            return 2
+        return 4
+    
+    @staticmethod
+    def write_output(
+        file_path: str,
+        output_folder: str,
+        original_size: int,
+        buffer: Union[io.BytesIO, bytes],
+        output_format: str,
+        overwrite: bool = True
+    ) -> Dict:
+        data = buffer.getbuffer() if isinstance(buffer, io.BytesIO) else buffer
+        output_path = ImageCompressor.build_output_path(
+            file_path, output_folder, ImageCompressor.extension_for(output_format)
+        )
+        # Written beside the target and renamed into place, so readers never see a
+        # partial file and anything hard-linked to the old output is left untouched
+        output_path = FileIO.write_atomic(output_path, data, overwrite)
+            
+        return {
+            'file': file_path,
+            'original_size': original_size,
+            'compressed_size': len(data),
+            'format': output_format,
+            'output_path': output_path
+        }
+    
+    @staticmethod
+    def cache_settings(
+        quality: int,
+        output_format: str,
+        target_size: Optional[float],
+        max_dimension: Optional[int] = None,
+        scale: Optional[float] = None,
+        min_ssim: Optional[float] = None,
+        png_colors: Optional[int] = None
+    ) -> Dict:
+        return {
+            'quality': quality,
+            'output_format': output_format,
+            'target_size': target_size,
+            'max_dimension': max_dimension,
+            'scale': scale,
+            'min_ssim': min_ssim,
+            'png_colors': png_colors
+        }
+    
+    @staticmethod
+    def restore_cached(
+        cache: ResultCache,
+        cache_key: str,
+        file_path: str,
+        output_folder: str,
+        overwrite: bool = True
+    ) -> Optional[Dict]:
+        entry = cache.get(cache_key)
+        if not entry:
+            return None
+        
+        output_path = ImageCompressor.build_output_path(file_path, output_folder, entry['extension'])
+        output_path = ResultCache.materialize(entry, output_path, overwrite)
+        return dict({
+            'file': file_path,
+            'original_size': entry['original_size'],
+            'compressed_size': entry['compressed_size'],
+            'format': entry['format'],
+            'output_path': output_path,
+            'cached': True
+        }, **entry['extra'])
+    
+    @staticmethod
+    def search_result(details: Optional[Dict]) -> Dict:
+        return {key: details[key] for key in ImageCompressor.SEARCH_KEYS if key in (details or {})}
+    
+    @staticmethod
+    def extension_for(output_format: str) -> str:
+        return ImageCompressor.EXTENSIONS.get(output_format, ".png")
+    
+    @staticmethod
+    def build_output_path(file_path: str, output_folder: str, extension: str) -> str:
+        return os.path.join(
+            output_folder or os.path.dirname(file_path),
+            f"{os.path.splitext(os.path.basename(file_path))[0]}_compressed{extension}"
+        )
+    
+    @staticmethod
+    def encode(img: Image.Image, output_format: str, quality: int, png_colors: Optional[int] = None) -> io.BytesIO:
+        # PNG ignores quality and stays lossless unless png_colors asks for a quantized palette
+        if output_format == "PNG":
+            return PngOptimizer.encode(img, png_colors)
+        # Every encode allocates its own BytesIO; nothing is pooled. What is saved is
+        # the copy afterwards: the writer and the cache take a view of this buffer
+        buffer = io.BytesIO()
+        options = ImageCompressor.ENCODER_OPTIONS.get(output_format, {"optimize": True})
+        if output_format in ImageCompressor.LOSSY_FORMATS:
+            img.save(buffer, format=output_format, quality=quality, **options)
+        else:
+            img.save(buffer, format=output_format, **options)
+        return buffer
+    
+    @staticmethod
+    def find_optimal_quality(
+        img: Image.Image,
+        target_size_bytes: float,
+        output_format: str = "JPEG",
+        probes: int = 1
+    ) -> int:
+        quality, _ = ImageCompressor.search_quality(img, target_size_bytes, output_format, probes=probes)
+        return quality
+    
+    @staticmethod
+    def search_quality(
+        img: Image.Image,
+        target_size_bytes: float,
+        output_format: str = "JPEG",
+        tolerance: float = TARGET_TOLERANCE,
+        details: Optional[Dict] = None,
+        probes: int = 1
+    ) -> Tuple[int, io.BytesIO]:
+        low, high = ImageCompressor.MIN_QUALITY, ImageCompressor.MAX_QUALITY
+        scale = 1.0
+        tried = {}
+        best = None
+        smallest = None
+        # With several probes, each round encodes a spread of qualities at once on
+        # threads (Pillow releases the GIL while encoding) and keeps the sub-interval
+        # holding the target, instead of halving the interval one encode at a time
+        probes = ImageCompressor.probe_threads(probes)
+        executor = ThreadPoolExecutor(max_workers=probes) if probes > 1 else None
+        
+        try:
+            curve = ImageCompressor.size_curve(img, output_format, executor)
+            for _ in range(ImageCompressor.MAX_FULL_ENCODES):
+                qualities = ImageCompressor._probe_qualities(curve, target_size_bytes / scale, low, high, probes, tried)
+                results = ImageCompressor._run_probes(img, output_format, qualities, executor)
+                
+                found = False
+                nearest = None
+                for quality, buffer in sorted(results.items()):
+                    size = buffer.getbuffer().nbytes
+                    tried[quality] = size
                     
-                if target_size:
-                    quality = ImageCompressor.find_optimal_quality(img, target_size)
+                    if smallest is None or size < smallest[2]:
+                        smallest = (quality, buffer, size)
+                    if size <= target_size_bytes:
+                        if best is None or quality > best[0]:
+                            best = (quality, buffer, size)
+                        if size >= target_size_bytes * (1 - tolerance):
+                            found = True
+                        low = max(low, quality + 1)
+                    else:
+                        high = min(high, quality - 1)
+                    if nearest is None or abs(math.log(size / target_size_bytes)) < abs(math.log(nearest[1] / target_size_bytes)):
+                        nearest = (quality, size)
                     
-                if output_format == "PNG":
-                    img.save(output_path, format=output_format, optimize=True)
+                if found or low > high:
+                    break
+                scale = nearest[1] / ImageCompressor._curve_size(curve, nearest[0])
+        finally:
+            if executor:
+                executor.shutdown(wait=True, cancel_futures=True)
+        
+        if best is None and ImageCompressor.MIN_QUALITY not in tried:
+            buffer = ImageCompressor.encode(img, output_format, ImageCompressor.MIN_QUALITY)
+            smallest = (ImageCompressor.MIN_QUALITY, buffer, buffer.getbuffer().nbytes)
+            tried[ImageCompressor.MIN_QUALITY] = smallest[2]
+        
+        quality, buffer, _ = best or smallest
+        if details is not None:
+            details['search_iterations'] = len(tried)
+            details['proxy_encodes'] = len(curve)
+        return quality, buffer
+    
+    @staticmethod
+    def search_similarity(
+        img: Image.Image,
+        output_format: str,
+        min_ssim: float,
+        max_quality: int = MAX_QUALITY,
+        details: Optional[Dict] = None,
+        downsample: int = 1
+    ) -> Tuple[int, io.BytesIO]:
+        # Lowest quality whose decoded luma keeps SSIM >= min_ssim, judged on the
+        # full-resolution tile mosaic so each probe costs the same on any image size
+        proxy, _ = ImageCompressor._build_proxy(img)
+        guard = PerceptualGuard(proxy, downsample)
+        scores = {}
+        
+        def passes(quality: int) -> bool:
+            scores[quality] = guard.score_buffer(ImageCompressor.encode(proxy, output_format, quality))
+            return scores[quality] >= min_ssim
+        
+        # SSIM rises with quality, so bisect; if even the cap fails, the cap is as close as allowed
+        low, high = ImageCompressor.MIN_QUALITY, max(ImageCompressor.MIN_QUALITY, max_quality)
+        if passes(high):
+            while low < high:
+                middle = (low + high) // 2
+                if passes(middle):
+                    high = middle
                 else:
-                    img.save(output_path, format=output_format, quality=quality, optimize=True)
-                    
-                new_size = os.path.getsize(output_path)
-                
-                return {
-                    'file': file_path,
-                    'original_size': original_size,
-                    'compressed_size': new_size,
-                    'format': output_format,
-                    'output_path': output_path
-                }
-        except Exception as e:
-            raise Exception(f"Error compressing image {file_path}: {str(e)}")
+                    low = middle + 1
+        
+        if details is not None:
+            details['search_iterations'] = len(scores)
+            details['quality'] = high
+            details['ssim'] = scores[high]
+            details['ssim_met'] = scores[high] >= min_ssim
+        return high, ImageCompressor.encode(img, output_format, high)
     
     @staticmethod
-    def find_optimal_quality(img: Image.Image, target_size_bytes: float) -> int:
-        min_quality = 1
-        max_quality = 95
-        best_quality = max_quality
-        best_size = float('inf')
+    def _probe_qualities(
+        curve: List[Tuple[int, float]],
+        target_size_bytes: float,
+        low: int,
+        high: int,
+        probes: int,
+        tried: Dict[int, int]
+    ) -> List[int]:
+        predicted = ImageCompressor._predict_quality(curve, target_size_bytes, low, high)
+        if probes == 1:
+            return [predicted if predicted not in tried else (low + high) // 2]
         
-        while min_quality <= max_quality:
-            current_quality = (min_quality + max_quality) // 2
-            
-            temp_output = io.BytesIO()
-            img.save(temp_output, format=img.format or 'JPEG', 
-                    quality=current_quality, optimize=True)
-            current_size = temp_output.tell()
-            
-            if abs(current_size - target_size_bytes) < abs(best_size - target_size_bytes):
-                best_quality = current_quality
-                best_size = current_size
-            
-            if current_size > target_size_bytes:
-                max_quality = current_quality - 1
-            else:
-                min_quality = current_quality + 1
+        # Evenly spaced probes over a window centred on the prediction; the window
+        # shrinks with the interval, so the last round covers every quality left
+        span = high - low + 1
+        width = min(span, max(probes, span // ImageCompressor.PROBE_WINDOW_DIVISOR))
+        start = min(max(low, predicted - width // 2), high - width + 1)
+        qualities = {start + (2 * index + 1) * width // (2 * probes) for index in range(probes)}
+        qualities.discard(min(qualities, key=lambda quality: abs(quality - predicted)))
+        qualities.add(predicted)
+        
+        untried = sorted(quality for quality in qualities if quality not in tried)
+        return untried or [(low + high) // 2]
+    
+    @staticmethod
+    def _run_probes(
+        img: Image.Image,
+        output_format: str,
+        qualities: List[int],
+        executor: Optional[ThreadPoolExecutor]
+    ) -> Dict[int, io.BytesIO]:
+        if executor is None or len(qualities) == 1:
+            return {quality: ImageCompressor.encode(img, output_format, quality) for quality in qualities}
+        
+        # A round never has more probes than the pool has threads, so every encode
+        # starts at once. Each round is waited out in full: a started encode cannot
+        # be stopped, and one left running would outlive the memory reserved for it
+        futures = {
+            quality: executor.submit(ImageCompressor.encode, ImageCompressor.shared_view(img), output_format, quality)
+            for quality in qualities
+        }
+        return {quality: future.result() for quality, future in futures.items()}
+    
+    @staticmethod
+    def shared_view(img: Image.Image) -> Image.Image:
+        # A second Image object over the same pixel memory. save() stores encoder
+        # settings on the object, so concurrent encodes each need their own, but
+        # the pixels are only read and need not be copied. Image._new is not public
+        # Pillow API, so a release without it falls back to copying the pixels
+        try:
+            return img._new(img.im)
+        except AttributeError:
+            return img.copy()
+    
+    @staticmethod
+    def size_curve(
+        img: Image.Image,
+        output_format: str = "JPEG",
+        executor: Optional[ThreadPoolExecutor] = None
+    ) -> List[Tuple[int, float]]:
+        proxy, pixel_ratio = ImageCompressor._build_proxy(img)
+        
+        def proxy_size(quality: int) -> float:
+            source = proxy if executor is None else ImageCompressor.shared_view(proxy)
+            return len(ImageCompressor.encode(source, output_format, quality).getbuffer()) * pixel_ratio
+        
+        qualities = ImageCompressor.PROXY_QUALITIES
+        sizes = executor.map(proxy_size, qualities) if executor else map(proxy_size, qualities)
+        return list(zip(qualities, sizes))
+    
+    @staticmethod
+    def predict_sizes(curve: List[Tuple[int, float]]) -> List[float]:
+        # Estimated full-image size at every quality from MIN_QUALITY to MAX_QUALITY
+        return [
+            ImageCompressor._curve_size(curve, quality)
+            for quality in range(ImageCompressor.MIN_QUALITY, ImageCompressor.MAX_QUALITY + 1)
+        ]
+    
+    @staticmethod
+    def _build_proxy(img: Image.Image) -> Tuple[Image.Image, float]:
+        width, height = img.size
+        if width * height <= ImageCompressor.PROXY_PIXELS * 2:
+            return img, 1.0
         
-        return best_quality
\ No newline at end of file
+        tile = max(16, min(ImageCompressor.PROXY_TILE, width, height) // 16 * 16)
+        count = max(1, ImageCompressor.PROXY_PIXELS // (tile * tile))
+        cols = max(1, min(width // tile, round(math.sqrt(count * width / height))))
+        rows = max(1, min(height // tile, math.ceil(count / cols)))
+        
+        proxy = Image.new(img.mode, (cols * tile, rows * tile))
+        for row in range(rows):
+            top = int((row + 0.5) * height / rows - tile / 2)
+            top = min(max(0, top // 16 * 16), height - tile)
+            for col in range(cols):
+                left = int((col + 0.5) * width / cols - tile / 2)
+                left = min(max(0, left // 16 * 16), width - tile)
+                proxy.paste(img.crop((left, top, left + tile, top + tile)), (col * tile, row * tile))
+                
+        return proxy, (width * height) / (proxy.width * proxy.height)
+    
+    @staticmethod
+    def _curve_size(curve: List[Tuple[int, float]], quality: int) -> float:
+        if quality <= curve[0][0]:
+            (q0, s0), (q1, s1) = curve[0], curve[1]
+        elif quality >= curve[-1][0]:
+            (q0, s0), (q1, s1) = curve[-2], curve[-1]
+        else:
+            index = next(i for i in range(1, len(curve)) if curve[i][0] >= quality)
+            (q0, s0), (q1, s1) = curve[index - 1], curve[index]
+        
+        s0, s1 = max(s0, 1.0), max(s1, s0, 1.0)
+        log_size = math.log(s0) + (math.log(s1) - math.log(s0)) * (quality - q0) / (q1 - q0)
+        return math.exp(log_size)
+    
+    @staticmethod
+    def _predict_quality(curve: List[Tuple[int, float]], target_size_bytes: float, low: int, high: int) -> int:
+        for quality in range(high, low - 1, -1):
+            if ImageCompressor._curve_size(curve, quality) <= target_size_bytes:
+                return quality
+        return low
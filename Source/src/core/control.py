@@ -0,0 +1,40 @@
+import threading
+from typing import Optional
+
+
+class JobControl:
+    # Shared between the caller and a running batch: pausing stops new files
+    # from being read, cancelling also abandons files that have not started
+    POLL_SECONDS = 0.1
+
+    def __init__(self):
+        self._running = threading.Event()
+        self._running.set()
+        self._cancelled = threading.Event()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def pause(self) -> None:
+        if not self.cancelled:
+            self._running.clear()
+
+    def resume(self) -> None:
+        self._running.set()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        # Wake anything waiting on a pause so it can see the cancellation
+        self._running.set()
+
+    def wait(self, stop: Optional[threading.Event] = None) -> bool:
+        # Blocks while paused; False once the batch is cancelled or stopped
+        while not self._running.wait(JobControl.POLL_SECONDS):
+            if stop is not None and stop.is_set():
+                return False
+        return not self.cancelled and not (stop is not None and stop.is_set())
@@ -0,0 +1,214 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from PIL import Image
+
+from src.core.control import JobControl
+from src.core.perceptual import PerceptualGuard
+
+
+class DuplicateFinder:
+    # Groups a batch so each distinct image is compressed once. Exact copies share
+    # a size and a SHA-256, and only files whose sizes collide are read. Near
+    # duplicates (re-saved copies) must share format, dimensions and mode and a
+    # 64-bit difference hash; each match is then confirmed by luma SSIM on 1/8
+    # scale previews, which keeps burst shots that merely look alike apart
+    EXACT = "exact"
+    SIMILAR = "similar"
+    MODES = (EXACT, SIMILAR)
+    HASH_CHUNK_SIZE = 1024 * 1024
+    HASH_SIZE = 8
+    # Each hash cell averages a 4x4 block of the thumbnail
+    THUMBNAIL_CELL = 4
+    # Neighbouring cells must differ by more than this many grey levels to set a
+    # bit, so flat areas do not flip bits on re-encoding noise
+    HASH_MARGIN = 1.0
+    MAX_HASH_DISTANCE = 6
+    PREVIEW_REDUCE = 8
+    MIN_SSIM = 0.99
+    THREADS = 4
+
+    @staticmethod
+    def find(
+        files: List[Union[str, os.PathLike]],
+        mode: str = EXACT,
+        threads: int = THREADS,
+        control: Optional[JobControl] = None
+    ) -> Tuple[List[Union[str, os.PathLike]], Dict[str, List[Tuple[str, str]]]]:
+        # Returns the files to compress, in input order and as given, and each
+        # representative's duplicates as (file, "exact" or "similar"). A pause
+        # holds the search between files; after a cancel the rest are not read
+        if mode not in DuplicateFinder.MODES:
+            raise Exception(f"Error finding duplicates: unknown mode {mode}")
+
+        given = {}
+        for item in files:
+            given.setdefault(os.fspath(item), item)
+        files = [os.fspath(item) for item in files]
+
+        sizes = {}
+        by_size: Dict[int, List[str]] = {}
+        for file_path in files:
+            if file_path in sizes:
+                continue
+            try:
+                # Folder scans pass DirEntry objects whose stat is already cached
+                item = given[file_path]
+                if isinstance(item, os.DirEntry):
+                    sizes[file_path] = item.stat().st_size
+                else:
+                    sizes[file_path] = os.path.getsize(file_path)
+            except OSError:
+                # Unreadable files are left for the pipeline to report
+                sizes[file_path] = None
+                continue
+            by_size.setdefault(sizes[file_path], []).append(file_path)
+
+        groups: Dict[str, List[Tuple[str, str]]] = {}
+        representative = {}
+        colliding = [file_path for paths in by_size.values() if len(paths) > 1 for file_path in paths]
+        with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+            content_hash = DuplicateFinder._between_files(DuplicateFinder.content_hash, control)
+            digests = dict(zip(colliding, executor.map(content_hash, colliding)))
+            first_by_digest = {}
+            for file_path in files:
+                if file_path in representative:
+                    # The same path listed twice is the same image
+                    groups[representative[file_path]].append((file_path, DuplicateFinder.EXACT))
+                    continue
+                digest = digests.get(file_path)
+                key = (sizes[file_path], digest)
+                if digest is not None and key in first_by_digest:
+                    representative[file_path] = first_by_digest[key]
+                    groups[first_by_digest[key]].append((file_path, DuplicateFinder.EXACT))
+                    continue
+                if digest is not None:
+                    first_by_digest[key] = file_path
+                representative[file_path] = file_path
+                groups[file_path] = []
+
+            if mode == DuplicateFinder.SIMILAR:
+                unique = [file_path for file_path in groups if sizes[file_path] is not None]
+                thumbnails = executor.map(DuplicateFinder._between_files(DuplicateFinder.thumbnail, control), unique)
+                DuplicateFinder._merge_similar(unique, list(thumbnails), sizes, groups, control)
+
+        representatives = [given[file_path] for file_path in dict.fromkeys(files) if file_path in groups]
+        return representatives, {file_path: members for file_path, members in groups.items() if members}
+
+    @staticmethod
+    def _between_files(function: Callable, control: Optional[JobControl]) -> Callable:
+        # Files skipped after a cancel look unreadable, so they are never grouped
+        if control is None:
+            return function
+        return lambda file_path: function(file_path) if control.wait() else None
+
+    @staticmethod
+    def content_hash(file_path: str) -> Optional[str]:
+        try:
+            digest = hashlib.sha256()
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(DuplicateFinder.HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            return digest.hexdigest()
+        except OSError:
+            return None
+
+    @staticmethod
+    def thumbnail(file_path: str):
+        import numpy as np
+
+        cell = DuplicateFinder.THUMBNAIL_CELL
+        size = ((DuplicateFinder.HASH_SIZE + 1) * cell, DuplicateFinder.HASH_SIZE * cell)
+        try:
+            with Image.open(file_path) as img:
+                key = (img.format, img.size, img.mode)
+                # JPEG decodes straight to a small greyscale image in the DCT domain
+                img.draft('L', size)
+                return key, np.asarray(img.convert('L').resize(size, Image.Resampling.BOX))
+        except Exception:
+            return None
+
+    @staticmethod
+    def difference_hashes(thumbnails):
+        import numpy as np
+
+        # One pass over the whole stack: average cells, compare each with its right neighbour
+        count, rows, cell = len(thumbnails), DuplicateFinder.HASH_SIZE, DuplicateFinder.THUMBNAIL_CELL
+        cells = thumbnails.reshape(count, rows, cell, rows + 1, cell).mean(axis=(2, 4))
+        bits = cells[:, :, 1:] - cells[:, :, :-1] > DuplicateFinder.HASH_MARGIN
+        return np.packbits(bits.reshape(count, -1), axis=1).view(np.uint64).ravel()
+
+    @staticmethod
+    def preview(file_path: str) -> Optional[Image.Image]:
+        try:
+            with Image.open(file_path) as img:
+                size = tuple(max(1, edge // DuplicateFinder.PREVIEW_REDUCE) for edge in img.size)
+                img.draft('L', size)
+                luma = img.convert('L')
+                return luma if luma.size == size else luma.resize(size, Image.Resampling.BOX)
+        except Exception:
+            return None
+
+    @staticmethod
+    def hamming_distances(hashes, value):
+        import numpy as np
+
+        different = hashes ^ value
+        if hasattr(np, 'bitwise_count'):
+            return np.bitwise_count(different)
+        return np.unpackbits(different.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+    @staticmethod
+    def _merge_similar(
+        files: List[str],
+        thumbnails: List,
+        sizes: Dict[str, Optional[int]],
+        groups: Dict[str, List[Tuple[str, str]]],
+        control: Optional[JobControl] = None
+    ) -> None:
+        import numpy as np
+
+        buckets: Dict[Tuple, List[int]] = {}
+        for index, thumbnail in enumerate(thumbnails):
+            if thumbnail is not None:
+                buckets.setdefault(thumbnail[0], []).append(index)
+
+        for indices in buckets.values():
+            if len(indices) < 2:
+                continue
+            # Largest first, so the copy with the most detail is the one compressed
+            indices.sort(key=lambda index: -sizes[files[index]])
+            hashes = DuplicateFinder.difference_hashes(np.stack([thumbnails[index][1] for index in indices]))
+            assigned = np.zeros(len(indices), dtype=bool)
+
+            for seed in range(len(indices)):
+                if assigned[seed]:
+                    continue
+                if control and not control.wait():
+                    return
+                assigned[seed] = True
+                distances = DuplicateFinder.hamming_distances(hashes, hashes[seed])
+                close = np.flatnonzero((distances <= DuplicateFinder.MAX_HASH_DISTANCE) & ~assigned)
+                if not close.size:
+                    continue
+                reference = DuplicateFinder.preview(files[indices[seed]])
+                if reference is None:
+                    continue
+                guard = PerceptualGuard(reference)
+                close = [match for match in close if DuplicateFinder._looks_same(guard, files[indices[match]])]
+                assigned[close] = True
+
+                members = groups[files[indices[seed]]]
+                for match in close:
+                    file_path = files[indices[match]]
+                    members.append((file_path, DuplicateFinder.SIMILAR))
+                    members.extend((copy, DuplicateFinder.SIMILAR) for copy, _ in groups.pop(file_path))
+
+    @staticmethod
+    def _looks_same(guard: PerceptualGuard, file_path: str) -> bool:
+        candidate = DuplicateFinder.preview(file_path)
+        if candidate is None:
+            return False
+        return guard.score(PerceptualGuard.luma_plane(candidate)) >= DuplicateFinder.MIN_SSIM
@@ -1,8 +1,13 @@
 import os
-from typing import List, Tuple
+import queue
+import threading
+from typing import Iterator, List, Tuple
 
 class FileHandler:
     VALID_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.PNG', '.JPG', '.JPEG')
+    SCAN_WORKERS = 8
+    SCAN_QUEUE_SIZE = 1024
+    _SCAN_DONE = object()
     
     @staticmethod
     def validate_file(file_path: str) -> bool:
@@ -13,18 +18,83 @@ class FileHandler:
     
     @staticmethod
     def get_files_from_folder(folder_path: str) -> List[str]:
-        valid_files = []
-        for root, _, filenames in os.walk(folder_path):
-            for filename in filenames:
-                if filename.lower().endswith(FileHandler.VALID_EXTENSIONS):
-                    full_path = os.path.join(root, filename)
-                    valid_files.append(full_path)
-        return valid_files
+        return list(FileHandler.iter_files_from_folder(folder_path))
+    
+    @staticmethod
+    def iter_files_from_folder(folder_path: str, workers: int = SCAN_WORKERS) -> Iterator[str]:
+        for entry in FileHandler.scan_folder(folder_path, workers):
+            yield entry.path
+    
+    @staticmethod
+    def scan_folder(folder_path: str, workers: int = SCAN_WORKERS) -> Iterator[os.DirEntry]:
+        # Directories are listed by a pool of threads; image entries are yielded
+        # as soon as they are found, each with its stat already cached by a scan
+        # thread. Entries are path-like, so the batch and cache reuse that stat
+        results = queue.Queue(maxsize=FileHandler.SCAN_QUEUE_SIZE)
+        directories = queue.Queue()
+        stop = threading.Event()
+        lock = threading.Lock()
+        remaining = [1]
+        
+        def put(item) -> None:
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+        
+        def scan() -> None:
+            while True:
+                path = directories.get()
+                if path is None:
+                    return
+                try:
+                    with os.scandir(path) as entries:
+                        for entry in entries:
+                            if stop.is_set():
+                                break
+                            try:
+                                if entry.is_dir(follow_symlinks=False):
+                                    with lock:
+                                        remaining[0] += 1
+                                    directories.put(entry.path)
+                                elif entry.name.lower().endswith(FileHandler.VALID_EXTENSIONS) and entry.is_file():
+                                    entry.stat()
+                                    put(entry)
+                            except OSError:
+                                pass
+                except OSError:
+                    pass
+                finally:
+                    with lock:
+                        remaining[0] -= 1
+                        finished = remaining[0] == 0
+                    if finished:
+                        put(FileHandler._SCAN_DONE)
+        
+        threads = [threading.Thread(target=scan, daemon=True) for _ in range(max(1, workers))]
+        directories.put(folder_path)
+        for thread in threads:
+            thread.start()
+        
+        try:
+            while True:
+                entry = results.get()
+                if entry is FileHandler._SCAN_DONE:
+                    break
+                yield entry
+        finally:
+            stop.set()
+            for _ in threads:
+                directories.put(None)
     
     @staticmethod
-    def parse_dropped_files(data: str) -> Tuple[List[str], List[str]]:
+    def parse_dropped_files(data: str) -> Tuple[List[str], List[str], List[str]]:
+        # Dropped folders are returned unlisted, so the caller can scan them off the UI thread
         valid_files = []
         invalid_files = []
+        folders = []
         
         for file_path in data.split('{') if isinstance(data, str) else data:
             file_path = file_path.strip('{}')
@@ -34,7 +104,6 @@ class FileHandler:
                 else:
                     invalid_files.append(file_path)
             elif os.path.isdir(file_path):
-                folder_files = FileHandler.get_files_from_folder(file_path)
-                valid_files.extend(folder_files)
+                folders.append(file_path)
                 
-        return valid_files, invalid_files
\ No newline at end of file
+        return valid_files, invalid_files, folders
\ No newline at end of file
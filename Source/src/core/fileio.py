@@ -0,0 +1,100 @@
+import mmap
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+
+
+class FileIO:
+    # Inputs at least this large are mapped rather than read through a buffer
+    MMAP_THRESHOLD = 8 * 1024 * 1024
+    # Linux ioctl that shares a file's extents copy-on-write (Btrfs, XFS)
+    FICLONE = 0x40049409
+
+    @staticmethod
+    @contextmanager
+    def open_input(file_path: str, size: Optional[int] = None) -> Iterator[Tuple[Union[BinaryIO, mmap.mmap], int]]:
+        # size may come from a stat the caller already holds
+        with open(file_path, 'rb') as f:
+            if size is None:
+                size = os.fstat(f.fileno()).st_size
+            mapped = None
+            if size >= FileIO.MMAP_THRESHOLD:
+                try:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (OSError, ValueError):
+                    mapped = None
+            if mapped is None:
+                yield f, size
+                return
+            try:
+                yield mapped, size
+            finally:
+                mapped.close()
+
+    @staticmethod
+    def temp_path(output_path: str) -> str:
+        directory, name = os.path.split(output_path)
+        return os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    @staticmethod
+    def numbered_paths(output_path: str) -> Iterator[str]:
+        yield output_path
+        stem, extension = os.path.splitext(output_path)
+        number = 1
+        while True:
+            yield f"{stem}_{number}{extension}"
+            number += 1
+
+    @staticmethod
+    def commit(temp_path: str, output_path: str, overwrite: bool = True) -> str:
+        # os.replace is atomic, so readers see either the old file or the complete new one
+        if overwrite:
+            os.replace(temp_path, output_path)
+            return output_path
+        for candidate in FileIO.numbered_paths(output_path):
+            try:
+                # O_EXCL claims the name even when another writer races for it
+                os.close(os.open(candidate, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            except FileExistsError:
+                continue
+            os.replace(temp_path, candidate)
+            return candidate
+
+    @staticmethod
+    def clone_file(source_path: str, target_path: str) -> None:
+        # A reflink shares blocks until either file is written, so it is as cheap as a
+        # hard link but editing one file never changes the other; elsewhere it is a copy
+        if hasattr(os, 'uname') and os.uname().sysname == 'Linux':
+            import fcntl
+
+            with open(source_path, 'rb') as source, open(target_path, 'wb') as target:
+                try:
+                    fcntl.ioctl(target.fileno(), FileIO.FICLONE, source.fileno())
+                    return
+                except OSError:
+                    pass
+        shutil.copyfile(source_path, target_path)
+
+    @staticmethod
+    def copy_atomic(source_path: str, output_path: str, overwrite: bool = True) -> str:
+        # Always an independent file, never a hard link, so editing one copy leaves the others alone
+        temp_path = FileIO.temp_path(output_path)
+        try:
+            FileIO.clone_file(source_path, temp_path)
+            return FileIO.commit(temp_path, output_path, overwrite)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def write_atomic(output_path: str, data, overwrite: bool = True) -> str:
+        temp_path = FileIO.temp_path(output_path)
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            return FileIO.commit(temp_path, output_path, overwrite)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
@@ -0,0 +1,62 @@
+import ctypes
+import os
+import threading
+from typing import Optional
+
+
+class MemoryBudget:
+    DEFAULT_FRACTION = 0.5
+    FALLBACK_LIMIT = 2 * 1024 * 1024 * 1024
+
+    def __init__(self, limit_bytes: Optional[int] = None):
+        self.limit = limit_bytes or MemoryBudget.default_limit()
+        self.used = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, amount: int, cancelled: Optional[threading.Event] = None) -> bool:
+        with self._condition:
+            # A job larger than the whole budget is still admitted, but only on its own
+            while self.used > 0 and self.used + amount > self.limit:
+                if cancelled is not None and cancelled.is_set():
+                    return False
+                self._condition.wait(0.1)
+            self.used += amount
+            return True
+
+    def release(self, amount: int) -> None:
+        with self._condition:
+            self.used = max(0, self.used - amount)
+            self._condition.notify_all()
+
+    @staticmethod
+    def physical_memory() -> Optional[int]:
+        try:
+            if os.name == 'nt':
+                class MEMORYSTATUSEX(ctypes.Structure):
+                    _fields_ = [
+                        ('dwLength', ctypes.c_ulong),
+                        ('dwMemoryLoad', ctypes.c_ulong),
+                        ('ullTotalPhys', ctypes.c_ulonglong),
+                        ('ullAvailPhys', ctypes.c_ulonglong),
+                        ('ullTotalPageFile', ctypes.c_ulonglong),
+                        ('ullAvailPageFile', ctypes.c_ulonglong),
+                        ('ullTotalVirtual', ctypes.c_ulonglong),
+                        ('ullAvailVirtual', ctypes.c_ulonglong),
+                        ('ullAvailExtendedVirtual', ctypes.c_ulonglong)
+                    ]
+
+                status = MEMORYSTATUSEX()
+                status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+                if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                    return int(status.ullTotalPhys)
+                return None
+            return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+        except (AttributeError, ValueError, OSError):
+            return None
+
+    @staticmethod
+    def default_limit() -> int:
+        total = MemoryBudget.physical_memory()
+        if not total:
+            return MemoryBudget.FALLBACK_LIMIT
+        return int(total * MemoryBudget.DEFAULT_FRACTION)
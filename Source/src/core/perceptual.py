@@ -0,0 +1,75 @@
+import io
+
+from PIL import Image
+
+
+class PerceptualGuard:
+    # Luma SSIM over 8x8 windows stepping 4 px. Windows are built from 4x4 cell
+    # sums, so each statistic is one reshape-and-sum over the plane; sums of
+    # 8-bit values and their products stay exact in float32. The windows
+    # overlap JPEG's block edges, so blocking is seen. Reference sums are
+    # computed once, and each probe adds one decode and three cell sums
+    DEFAULT_MIN_SSIM = 0.98
+    CELL = 4
+    K1 = 0.01
+    K2 = 0.03
+
+    def __init__(self, reference: Image.Image, downsample: int = 1):
+        self.downsample = max(1, downsample)
+        self.x = PerceptualGuard.luma_plane(reference, self.downsample)
+        self.sum_x = PerceptualGuard.window_sums(self.x)
+        self.sum_xx = PerceptualGuard.window_sums(self.x * self.x)
+
+    @staticmethod
+    def luma_plane(img: Image.Image, downsample: int = 1):
+        import numpy as np
+
+        # Pillow's L conversion uses the same BT.601 weights as JPEG's Y channel
+        luma = img if img.mode == 'L' else img.convert('L')
+        if downsample > 1:
+            luma = luma.reduce(downsample)
+        return np.asarray(luma, dtype=np.float32)
+
+    @staticmethod
+    def decoded_luma(buffer: io.BytesIO, downsample: int = 1):
+        with Image.open(io.BytesIO(buffer.getbuffer())) as decoded:
+            # JPEG can decode straight to its Y channel, skipping chroma upsampling and colour conversion
+            decoded.draft('L', decoded.size)
+            return PerceptualGuard.luma_plane(decoded, downsample)
+
+    @staticmethod
+    def window_sums(plane):
+        import numpy as np
+
+        cell = PerceptualGuard.CELL
+        rows, columns = plane.shape[0] // cell, plane.shape[1] // cell
+        cells = plane[:rows * cell, :columns * cell].reshape(rows, cell, columns, cell).sum(axis=(1, 3))
+        windows = cells[:-1, :-1] + cells[1:, :-1] + cells[:-1, 1:] + cells[1:, 1:]
+        return windows.astype(np.float64)
+
+    def score(self, candidate) -> float:
+        import numpy as np
+
+        y = candidate
+        if y.shape != self.x.shape or min(y.shape) < 2 * PerceptualGuard.CELL:
+            return 1.0 if np.array_equal(y, self.x) else 0.0
+
+        sum_y = PerceptualGuard.window_sums(y)
+        sum_yy = PerceptualGuard.window_sums(y * y)
+        sum_xy = PerceptualGuard.window_sums(self.x * y)
+
+        # Sample (n - 1) variances, as in the reference SSIM implementation
+        n = (2 * PerceptualGuard.CELL) ** 2
+        mu_x, mu_y = self.sum_x / n, sum_y / n
+        var_x = (self.sum_xx - self.sum_x * mu_x) / (n - 1)
+        var_y = (sum_yy - sum_y * mu_y) / (n - 1)
+        cov = (sum_xy - self.sum_x * mu_y) / (n - 1)
+        c1 = (PerceptualGuard.K1 * 255) ** 2
+        c2 = (PerceptualGuard.K2 * 255) ** 2
+
+        numerator = (2 * mu_x * mu_y + c1) * (2 * cov + c2)
+        denominator = (mu_x * mu_x + mu_y * mu_y + c1) * (var_x + var_y + c2)
+        return float(np.mean(numerator / denominator))
+
+    def score_buffer(self, buffer: io.BytesIO) -> float:
+        return self.score(PerceptualGuard.decoded_luma(buffer, self.downsample))
@@ -0,0 +1,291 @@
+import io
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from PIL import Image, UnidentifiedImageError
+
+from src.core.cache import ResultCache
+from src.core.compressor import ImageCompressor
+from src.core.control import JobControl
+from src.core.fileio import FileIO
+from src.core.memory import MemoryBudget
+from src.utils.metrics import MetricsRegistry
+
+
+def _encode_job(
+    file_path: str,
+    data: Optional[bytes],
+    quality: int,
+    output_format: str,
+    target_size: Optional[float],
+    profile: bool = False,
+    max_dimension: Optional[int] = None,
+    scale: Optional[float] = None,
+    probes: int = 1,
+    min_ssim: Optional[float] = None,
+    png_colors: Optional[int] = None
+) -> Tuple[io.BytesIO, str, Optional[Dict]]:
+    details = {} if profile or min_ssim else None
+    try:
+        if data is None:
+            # Large inputs are mapped here rather than read and pickled by the parent
+            with FileIO.open_input(file_path) as (source, _):
+                buffer, output_format = ImageCompressor.encode_file(
+                    source, quality, output_format, target_size, details, max_dimension, scale, probes, min_ssim,
+                    png_colors
+                )
+        else:
+            buffer, output_format = ImageCompressor.encode_file(
+                io.BytesIO(data), quality, output_format, target_size, details, max_dimension, scale, probes, min_ssim,
+                png_colors
+            )
+    except UnidentifiedImageError:
+        raise UnidentifiedImageError(f"cannot identify image file '{file_path}'")
+    # The buffer itself goes back: no copy on the thread pool, one pickle on the process pool
+    return buffer, output_format, details
+
+
+class _Job:
+    __slots__ = ('index', 'file_path', 'stat', 'original_size', 'cache_key', 'started', 'read_ms')
+
+    def __init__(self, index: int, file_path: str, stat: Optional[os.stat_result] = None):
+        self.index = index
+        self.file_path = file_path
+        self.stat = stat
+        self.original_size = 0
+        self.cache_key = None
+        self.started = 0.0
+        self.read_ms = 0.0
+
+
+class CompressionPipeline:
+    # Files move through read -> encode -> write stages. Reads and writes run on
+    # I/O threads, encoding runs on the worker pool, and a semaphore caps how many
+    # files are inside the pipeline so memory stays flat on any batch size. Each
+    # encode is also admitted against a RAM budget estimated from the image header
+    IO_THREADS = 4
+    JOBS_PER_WORKER = 4
+    _TOTAL = object()
+    _FAILED = object()
+
+    def __init__(
+        self,
+        workers: int,
+        io_threads: int = IO_THREADS,
+        max_in_flight: Optional[int] = None,
+        memory_limit: Optional[int] = None
+    ):
+        self.workers = max(1, workers)
+        self.io_threads = max(1, io_threads)
+        self.max_in_flight = max_in_flight or self.workers * CompressionPipeline.JOBS_PER_WORKER
+        self.memory = MemoryBudget(memory_limit)
+
+    def run(
+        self,
+        files: Iterable[Union[str, os.PathLike]],
+        output_folder: str,
+        quality: int,
+        output_format: str,
+        target_size: Optional[float] = None,
+        ordered: bool = True,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: Optional[int] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        targets: Optional[Dict[str, float]] = None,
+        overwrite: bool = True,
+        max_dimension: Optional[int] = None,
+        scale: Optional[float] = None,
+        control: Optional[JobControl] = None,
+        probes: int = 1,
+        min_ssim: Optional[float] = None,
+        png_colors: Optional[int] = None
+    ) -> Iterator[Dict]:
+        stop = threading.Event()
+        slots = threading.Semaphore(self.max_in_flight)
+        read_queue = queue.Queue()
+        write_queue = queue.Queue()
+        results = queue.Queue()
+
+        cache = ResultCache(cache_dir, cache_max_bytes) if cache_dir else None
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            executor = ThreadPoolExecutor(max_workers=1)
+
+        # Per-stage timings are collected whenever a registry is listening
+        profile = metrics is not None
+
+        def finish(job: _Job, stat: Dict) -> None:
+            if metrics:
+                metrics.record(stat)
+            results.put((job.index, stat))
+
+        def fail(job: _Job, error: Exception) -> None:
+            finish(job, {'file': job.file_path, 'error': f"Error compressing image {job.file_path}: {str(error)}"})
+
+        def feed() -> None:
+            index = 0
+            try:
+                for file_path in files:
+                    while not slots.acquire(timeout=0.1):
+                        if stop.is_set():
+                            return
+                    if stop.is_set() or (control and not control.wait(stop)):
+                        return
+                    # Folder scans hand over DirEntry objects whose stat is already cached
+                    stat = file_path.stat() if isinstance(file_path, os.DirEntry) else None
+                    read_queue.put(_Job(index, os.fspath(file_path), stat))
+                    index += 1
+            except Exception as e:
+                results.put((CompressionPipeline._FAILED, e))
+            finally:
+                for _ in readers:
+                    read_queue.put(None)
+                results.put((CompressionPipeline._TOTAL, index))
+
+        def read() -> None:
+            while True:
+                job = read_queue.get()
+                if job is None:
+                    return
+                # Files already queued when the batch is paused wait here, before being read
+                if stop.is_set() or (control and not control.wait(stop)):
+                    continue
+                try:
+                    job.started = time.perf_counter()
+                    # A batch budget assigns each file its own target size
+                    job_target = targets.get(job.file_path, target_size) if targets else target_size
+                    if cache:
+                        settings = ImageCompressor.cache_settings(
+                            quality, output_format, job_target, max_dimension, scale, min_ssim, png_colors
+                        )
+                        job.cache_key = cache.make_key(job.file_path, settings, job.stat)
+                        stat = ImageCompressor.restore_cached(
+                            cache, job.cache_key, job.file_path, output_folder, overwrite
+                        )
+                        if stat:
+                            if profile:
+                                stat['timings'] = {'cache': (time.perf_counter() - job.started) * 1000}
+                            finish(job, stat)
+                            continue
+
+                    read_start = time.perf_counter()
+                    with FileIO.open_input(job.file_path, job.stat.st_size if job.stat else None) as (source, size):
+                        job.original_size = size
+                        cost = estimate(source, size)
+                        # Small inputs are read here so disk I/O overlaps encoding; large ones
+                        # are mapped by the worker instead of being copied through the pool
+                        data = source.read() if size < FileIO.MMAP_THRESHOLD else None
+                    job.read_ms = (time.perf_counter() - read_start) * 1000
+                    if not self.memory.acquire(cost, stop):
+                        continue
+                    try:
+                        future = executor.submit(
+                            _encode_job, job.file_path, data, quality, output_format, job_target, profile,
+                            max_dimension, scale, probes, min_ssim, png_colors
+                        )
+                    except Exception:
+                        self.memory.release(cost)
+                        raise
+                    future.add_done_callback(lambda done, job=job, cost=cost: encoded(job, done, cost))
+                except Exception as e:
+                    fail(job, e)
+
+        def estimate(source, size: int) -> int:
+            try:
+                with Image.open(source) as header:
+                    resolved_format = header.format if output_format == "same" else output_format
+                    resized = ImageCompressor.resized_size(header.size, max_dimension, scale)
+                    if resized:
+                        # Shrinks the header's size to what a DCT-domain decode will produce
+                        header.draft(None, resized)
+                    # Only a target size search runs several encodes at once
+                    encodes = probes if target_size or targets else 1
+                    return size + ImageCompressor.estimate_memory(header.size, header.mode, resolved_format, encodes)
+            except Exception:
+                # Unreadable headers fail quickly in the encoder, so they cost next to nothing
+                return size
+            finally:
+                source.seek(0)
+
+        def encoded(job: _Job, future, cost: int) -> None:
+            self.memory.release(cost)
+            write_queue.put((job, future))
+
+        def write() -> None:
+            while True:
+                item = write_queue.get()
+                if item is None:
+                    return
+                job, future = item
+                if stop.is_set():
+                    continue
+                try:
+                    buffer, encoded_format, details = future.result()
+                    write_start = time.perf_counter()
+                    stat = ImageCompressor.write_output(
+                        job.file_path, output_folder, job.original_size, buffer, encoded_format, overwrite
+                    )
+                    stat.update(ImageCompressor.search_result(details))
+                    if cache:
+                        cache.put(job.cache_key, stat, buffer.getbuffer(), ImageCompressor.search_result(details))
+                    if profile:
+                        now = time.perf_counter()
+                        details['timings']['read'] = job.read_ms
+                        details['timings']['write'] = (now - write_start) * 1000
+                        # Total is wall time from read to written, so it includes time spent queued
+                        details['timings']['total'] = (now - job.started) * 1000
+                        stat.update(details)
+                    finish(job, stat)
+                except Exception as e:
+                    fail(job, e)
+
+        readers = [threading.Thread(target=read, daemon=True) for _ in range(self.io_threads)]
+        writers = [threading.Thread(target=write, daemon=True) for _ in range(self.io_threads)]
+        feeder = threading.Thread(target=feed, daemon=True)
+        for thread in readers + writers + [feeder]:
+            thread.start()
+
+        total = None
+        delivered = 0
+        next_index = 0
+        reorder: Dict[int, Dict] = {}
+        try:
+            while total is None or delivered < total:
+                if control and control.cancelled:
+                    return
+                try:
+                    index, stat = results.get(timeout=JobControl.POLL_SECONDS)
+                except queue.Empty:
+                    continue
+                if index is CompressionPipeline._TOTAL:
+                    total = stat
+                    continue
+                if index is CompressionPipeline._FAILED:
+                    raise stat
+
+                if not ordered:
+                    delivered += 1
+                    slots.release()
+                    yield stat
+                    continue
+
+                reorder[index] = stat
+                while next_index in reorder:
+                    stat = reorder.pop(next_index)
+                    next_index += 1
+                    delivered += 1
+                    slots.release()
+                    yield stat
+        finally:
+            stop.set()
+            for _ in writers:
+                write_queue.put(None)
+            executor.shutdown(wait=True, cancel_futures=True)
+            if cache:
+                cache.close()
@@ -0,0 +1,148 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from PIL import Image, features
+
+
+class PngOptimizer:
+    # Output is lossless unless a palette size is asked for: images that already
+    # fit in 256 colours are mapped exactly, others are only quantized on request
+    MIN_COLORS = 2
+    MAX_COLORS = 256
+    ROWS_PER_CHUNK = 256
+    # zlib strategies tried side by side at the highest level; Pillow already
+    # picks each row's filter adaptively when optimizing, and lower levels never
+    # beat level 9 on size, so the strategy is what changes the stream most.
+    # None leaves the strategy to Pillow (Z_FILTERED for PNG), which is exactly
+    # what a plain optimize=True save writes. Large images are judged on a
+    # sample of tiles but always encoded that way too, so the output is never
+    # larger than a plain save; the sample's favourite is encoded beside it
+    # only when it promises to be at least MIN_GAIN smaller
+    STRATEGIES = (None, Image.DEFAULT_STRATEGY, Image.RLE)
+    MIN_GAIN = 0.01
+    PROXY_PIXELS = 128 * 1024
+    # The sample is at most this fraction of the image, so judging three
+    # strategies on it costs well under one full encode
+    PROXY_FRACTION = 16
+    PROXY_TILE = (256, 16)
+    PROXY_WIDTH = 1024
+
+    @staticmethod
+    def encode(img: Image.Image, colors: Optional[int] = None) -> io.BytesIO:
+        return PngOptimizer.smallest_stream(PngOptimizer.reduce(img, colors))
+
+    @staticmethod
+    def reduce(img: Image.Image, colors: Optional[int] = None) -> Image.Image:
+        if colors is not None:
+            colors = max(PngOptimizer.MIN_COLORS, min(PngOptimizer.MAX_COLORS, colors))
+        if img.mode == 'P':
+            if colors is None or len(img.getcolors(PngOptimizer.MAX_COLORS) or ()) <= colors:
+                return img
+            img = img.convert('RGBA' if img.has_transparency_data else 'RGB')
+        if img.mode not in ('RGB', 'RGBA'):
+            return img
+
+        found = img.getcolors(colors or PngOptimizer.MAX_COLORS)
+        if found is not None:
+            return PngOptimizer.to_palette(img, [color for _, color in found])
+        if colors is None:
+            return img
+        return PngOptimizer.quantize(img, colors)
+
+    @staticmethod
+    def to_palette(img: Image.Image, colors: list) -> Image.Image:
+        # Exact mapping for images that already use few colours
+        if img.mode == 'RGB':
+            palette = Image.new('P', (1, 1))
+            palette.putpalette([channel for color in colors for channel in color])
+            return img.quantize(palette=palette, dither=Image.Dither.NONE)
+
+        # Pillow's palette mapping ignores alpha, so RGBA pixels are looked up
+        # in the sorted palette by their packed value instead
+        import numpy as np
+
+        palette = np.array(colors, dtype=np.uint8)
+        keys = palette.view('<u4').ravel()
+        order = np.argsort(keys)
+        keys = keys[order]
+
+        indices = np.empty((img.height, img.width), dtype=np.uint8)
+        for top in range(0, img.height, PngOptimizer.ROWS_PER_CHUNK):
+            rows = np.asarray(img.crop((0, top, img.width, min(img.height, top + PngOptimizer.ROWS_PER_CHUNK))))
+            indices[top:top + rows.shape[0]] = np.searchsorted(keys, rows.view('<u4')[:, :, 0])
+
+        result = Image.fromarray(indices, 'P')
+        result.putpalette(palette[order].tobytes(), rawmode='RGBA')
+        return result
+
+    @staticmethod
+    def quantize(img: Image.Image, colors: int) -> Image.Image:
+        # Median cut is ~60x slower than the octree for little visible gain
+        if features.check_feature('libimagequant'):
+            method = Image.Quantize.LIBIMAGEQUANT
+        else:
+            method = Image.Quantize.FASTOCTREE
+        return img.quantize(colors=colors, method=method, dither=Image.Dither.FLOYDSTEINBERG)
+
+    @staticmethod
+    def smallest_stream(img: Image.Image) -> io.BytesIO:
+        if img.width * img.height <= PngOptimizer.PROXY_PIXELS:
+            # Small images try every strategy in full, but only when there are cores to run them side by side
+            strategies = PngOptimizer.STRATEGIES
+            if (os.cpu_count() or 1) < len(strategies):
+                strategies = strategies[:1]
+            return min(PngOptimizer._encode_strategies(img, strategies), key=lambda buffer: buffer.getbuffer().nbytes)
+
+        proxy = PngOptimizer._build_proxy(img)
+        sizes = dict(zip(
+            PngOptimizer.STRATEGIES,
+            (buffer.getbuffer().nbytes for buffer in PngOptimizer._encode_strategies(proxy))
+        ))
+        strategies = [None]
+        favourite = min(sizes, key=sizes.get)
+        if sizes[favourite] < sizes[None] * (1 - PngOptimizer.MIN_GAIN):
+            strategies.append(favourite)
+        return min(PngOptimizer._encode_strategies(img, strategies), key=lambda buffer: buffer.getbuffer().nbytes)
+
+    @staticmethod
+    def _encode_strategies(img: Image.Image, strategies: tuple = STRATEGIES) -> list:
+        def run(index: int, strategy: int) -> io.BytesIO:
+            # save() stores encoder settings on the image object, so each thread needs its own
+            source = img if index == 0 else img.copy()
+            buffer = io.BytesIO()
+            options = {} if strategy is None else {'compress_type': strategy}
+            source.save(buffer, format='PNG', optimize=True, **options)
+            return buffer
+
+        if len(strategies) == 1:
+            return [run(0, strategies[0])]
+        # zlib releases the GIL, so the strategies compress in parallel
+        with ThreadPoolExecutor(max_workers=len(strategies)) as executor:
+            return list(executor.map(run, range(len(strategies)), strategies))
+
+    @staticmethod
+    def _build_proxy(img: Image.Image) -> Image.Image:
+        # Short tiles spread evenly over the whole image, laid side by side; PNG
+        # filters and zlib work along rows, so this compresses like the original
+        tile_width = min(PngOptimizer.PROXY_TILE[0], img.width)
+        tile_height = min(PngOptimizer.PROXY_TILE[1], img.height)
+        columns = img.width // tile_width
+        positions = columns * (img.height // tile_height)
+        pixels = min(PngOptimizer.PROXY_PIXELS, img.width * img.height // PngOptimizer.PROXY_FRACTION)
+        count = max(1, min(positions, pixels // (tile_width * tile_height)))
+        per_row = max(1, PngOptimizer.PROXY_WIDTH // tile_width)
+
+        proxy = Image.new(img.mode, (tile_width * min(per_row, count), tile_height * -(-count // per_row)))
+        if img.mode == 'P':
+            # The palette size sets the bit depth, so the proxy must share it
+            proxy.putpalette(img.getpalette())
+        for index in range(count):
+            row, column = divmod(index * positions // count, columns)
+            tile = img.crop((
+                column * tile_width, row * tile_height,
+                (column + 1) * tile_width, (row + 1) * tile_height
+            ))
+            proxy.paste(tile, ((index % per_row) * tile_width, (index // per_row) * tile_height))
+        return proxy
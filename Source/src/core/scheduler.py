@@ -0,0 +1,105 @@
+import queue
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from src.core.batch import BatchCompressor
+from src.core.control import JobControl
+
+
+class JobScheduler:
+    # Runs one batch at a time on a background thread. The batch never touches
+    # the caller's state: it only posts events, which the caller drains from its
+    # own thread (the GUI does so from Tk's event loop):
+    #   ('status', text)
+    #   ('progress', done, stat)
+    #   ('finished', stats, failed, cancelled)
+    #   ('error', message)
+
+    def __init__(self):
+        self.events = queue.Queue()
+        self.control: Optional[JobControl] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def paused(self) -> bool:
+        return self.control is not None and self.control.paused
+
+    def submit(
+        self,
+        files: List[str],
+        workers: int,
+        total_size: Optional[float] = None,
+        memory_limit: Optional[int] = None,
+        **options
+    ) -> JobControl:
+        if self.running:
+            raise Exception("Error starting compression: a batch is already running")
+
+        control = JobControl()
+        self.control = control
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(list(files), workers, total_size, memory_limit, options, control),
+            daemon=True
+        )
+        self._thread.start()
+        return control
+
+    def pause(self) -> None:
+        if self.control:
+            self.control.pause()
+
+    def resume(self) -> None:
+        if self.control:
+            self.control.resume()
+
+    def cancel(self) -> None:
+        if self.control:
+            self.control.cancel()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread:
+            self._thread.join(timeout)
+
+    def drain(self) -> List[Tuple]:
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _run(
+        self,
+        files: List[str],
+        workers: int,
+        total_size: Optional[float],
+        memory_limit: Optional[int],
+        options: Dict,
+        control: JobControl
+    ) -> None:
+        stats = []
+        failed = []
+        try:
+            batch = BatchCompressor(workers, memory_limit=memory_limit)
+            if options.get('dedupe'):
+                self.events.put(('status', "Looking for duplicate images..."))
+            if total_size:
+                self.events.put(('status', "Planning qualities for the batch size..."))
+                results = batch.compress_to_budget(files, total_size=total_size, control=control, **options)
+            else:
+                results = batch.compress(files, control=control, **options)
+
+            for stat in results:
+                if BatchCompressor.is_error(stat):
+                    failed.append(stat)
+                else:
+                    stats.append(stat)
+                self.events.put(('progress', len(stats) + len(failed), stat))
+            self.events.put(('finished', stats, failed, control.cancelled))
+        except Exception as e:
+            self.events.put(('error', str(e)))
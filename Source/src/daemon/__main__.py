@@ -0,0 +1,69 @@
+import argparse
+import multiprocessing
+import signal
+import sys
+import threading
+from typing import List, Optional
+
+from src.core.cache import ResultCache
+from src.daemon.client import DaemonClient
+from src.daemon.server import CompressionDaemon
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="quickpress-daemon",
+        description="Keep QuickPress workers running and accept compression jobs over HTTP."
+    )
+    parser.add_argument("--host", default=DaemonClient.DEFAULT_HOST,
+                        help=f"address to listen on (default: {DaemonClient.DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DaemonClient.DEFAULT_PORT,
+                        help=f"TCP port to listen on, 0 for any free port (default: {DaemonClient.DEFAULT_PORT})")
+    parser.add_argument("--socket", default=None, metavar="PATH",
+                        help="listen on a Unix socket at PATH instead of TCP (only its owner can connect)")
+    parser.add_argument("--token-file", default=None, metavar="PATH",
+                        help="where to write the token TCP clients must send "
+                             f"(default: {DaemonClient.token_path(DaemonClient.DEFAULT_PORT)} for the default port)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="number of worker processes (default: all CPU cores)")
+    parser.add_argument("--max-pending", type=int, default=None, metavar="N",
+                        help="files queued or encoding at once before new ones wait "
+                             f"(default: {CompressionDaemon.JOBS_PER_WORKER} per worker)")
+    parser.add_argument("--cache", nargs="?", const=ResultCache.default_dir(), default=None, metavar="DIR",
+                        help="reuse results for unchanged images, stored in DIR "
+                             f"(default: {ResultCache.default_dir()})")
+    parser.add_argument("--cache-size", type=float, default=None, metavar="MB",
+                        help=f"maximum cache size in MB (default: {ResultCache.DEFAULT_MAX_BYTES // (1024 * 1024)})")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    daemon = CompressionDaemon(
+        workers=args.workers,
+        host=args.host,
+        port=args.port,
+        socket_path=args.socket,
+        cache_dir=args.cache,
+        cache_max_bytes=int(args.cache_size * 1024 * 1024) if args.cache_size else None,
+        max_pending=args.max_pending,
+        token_file=args.token_file
+    )
+    daemon.start()
+
+    # shutdown() waits for serve_forever to return, so it cannot run on the serving thread
+    stop = lambda *_: threading.Thread(target=daemon.shutdown, daemon=True).start()
+    signal.signal(signal.SIGINT, stop)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, stop)
+
+    print(f"QuickPress daemon listening on {daemon.address} with {daemon.workers} workers", file=sys.stderr)
+    if daemon.token:
+        print(f"Clients must send the token in {daemon.token_file}", file=sys.stderr)
+    daemon.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import http.client
+import json
+import os
+import select
+import socket
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import urlencode
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class DaemonClient:
+    # Talks to a running `python -m src.daemon`. Only the standard library is
+    # imported here, so callers pay no Pillow start-up cost. One connection is
+    # kept alive between calls; use one client per thread. Over TCP the token is
+    # read from the file the daemon writes on start, unless one is given
+    DEFAULT_HOST = "127.0.0.1"
+    DEFAULT_PORT = 8765
+    DEFAULT_TIMEOUT = 300
+    STATS_HEADER = "X-QuickPress-Stats"
+    TOKEN_HEADER = "X-QuickPress-Token"
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        socket_path: Optional[str] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        token: Optional[str] = None
+    ):
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.token = token
+        self._connection = None
+
+    @staticmethod
+    def token_path(port: int) -> str:
+        if os.name == 'nt':
+            base = os.path.join(os.environ.get('LOCALAPPDATA') or os.path.expanduser('~'), "QuickPress")
+        else:
+            base = os.environ.get('XDG_RUNTIME_DIR') or os.path.join(os.path.expanduser('~'), ".cache", "quickpress")
+        return os.path.join(base, f"daemon-{port}.token")
+
+    def compress(
+        self,
+        files: Iterable[Union[str, os.PathLike]],
+        output_folder: str = "",
+        **options
+    ) -> List[Dict]:
+        # options: quality, output_format, target_size (bytes), min_ssim, png_colors, max_dimension, scale, overwrite, probes
+        # Paths are resolved here because the daemon may run from another directory
+        body = dict(
+            options,
+            files=[os.path.abspath(file_path) for file_path in files],
+            output_folder=os.path.abspath(output_folder) if output_folder else ""
+        )
+        _, _, data = self._request("POST", "/compress", json.dumps(body).encode(), "application/json")
+        return json.loads(data)['results']
+
+    def compress_file(self, file_path: Union[str, os.PathLike], output_folder: str = "", **options) -> Dict:
+        return self.compress([file_path], output_folder, **options)[0]
+
+    def compress_bytes(self, data: bytes, **options) -> Tuple[bytes, Dict]:
+        query = urlencode({name: value for name, value in options.items() if value is not None})
+        _, headers, body = self._request("POST", f"/encode?{query}", data, "application/octet-stream")
+        return body, json.loads(headers.get(DaemonClient.STATS_HEADER))
+
+    def health(self) -> Dict:
+        return json.loads(self._request("GET", "/health")[2])
+
+    def metrics(self) -> Dict:
+        return json.loads(self._request("GET", "/metrics")[2])
+
+    def close(self) -> None:
+        if self._connection:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _token(self) -> str:
+        if self.token:
+            return self.token
+        # Read on every request, so a restarted daemon's new token is picked up
+        try:
+            with open(DaemonClient.token_path(self.port)) as f:
+                return f.read().strip()
+        except OSError as e:
+            raise Exception(f"Error reading compression daemon token: {str(e)}")
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._connection is None:
+            if self.socket_path:
+                self._connection = _UnixHTTPConnection(self.socket_path, self.timeout)
+            else:
+                self._connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        elif self._connection.sock is not None and select.select([self._connection.sock], [], [], 0)[0]:
+            # An idle keep-alive connection only turns readable once the daemon has closed it
+            self.close()
+            return self._connect()
+        return self._connection
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        content_type: Optional[str] = None
+    ) -> Tuple[int, http.client.HTTPMessage, bytes]:
+        headers = {'Content-Type': content_type} if content_type else {}
+        if not self.socket_path:
+            headers[DaemonClient.TOKEN_HEADER] = self._token()
+        for attempt in range(2):
+            connection = self._connect()
+            sent = False
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                sent = True
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (ConnectionError, http.client.RemoteDisconnected, http.client.CannotSendRequest):
+                # Retry once on a fresh connection, but a POST the daemon may already
+                # have acted on is never sent twice
+                self.close()
+                if attempt or sent and method != "GET":
+                    raise
+            except Exception:
+                self.close()
+                raise
+
+        if response.status != 200:
+            try:
+                message = json.loads(data)['error']
+            except Exception:
+                message = data.decode(errors='replace') or response.reason
+            raise Exception(f"Error from compression daemon ({response.status}): {message}")
+        return response.status, response.headers, data
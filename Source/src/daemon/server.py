@@ -0,0 +1,426 @@
+import hmac
+import io
+import json
+import multiprocessing
+import os
+import secrets
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from PIL import Image, UnidentifiedImageError
+
+from src.core.batch import BatchCompressor
+from src.core.cache import ResultCache
+from src.core.compressor import ImageCompressor
+from src.core.png import PngOptimizer
+from src.daemon.client import DaemonClient
+from src.utils.metrics import MetricsRegistry
+
+# Set in each worker process by _warm_worker
+_cache: Optional[ResultCache] = None
+
+
+def _warm_worker(cache_dir: Optional[str], cache_max_bytes: Optional[int]) -> None:
+    global _cache
+    # Registers every format plugin now instead of on the first request
+    Image.init()
+    if cache_dir:
+        _cache = ResultCache(cache_dir, cache_max_bytes)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _compress_path(file_path: str, output_folder: str, options: Dict) -> Dict:
+    try:
+        return ImageCompressor.compress_image(file_path, output_folder, cache=_cache, profile=True, **options)
+    except Exception as e:
+        return {'file': file_path, 'error': str(e)}
+
+
+def _compress_bytes(data: bytes, options: Dict) -> Tuple[Optional[io.BytesIO], Dict]:
+    start = time.perf_counter()
+    details = {}
+    try:
+        buffer, output_format = ImageCompressor.encode_file(
+            io.BytesIO(data),
+            options['quality'],
+            options['output_format'],
+            options.get('target_size'),
+            details,
+            options.get('max_dimension'),
+            options.get('scale'),
+            options.get('probes', 1),
+            options.get('min_ssim'),
+            options.get('png_colors')
+        )
+    except UnidentifiedImageError:
+        return None, {'error': "Error compressing image: cannot identify image data"}
+    except Exception as e:
+        return None, {'error': f"Error compressing image: {str(e)}"}
+
+    ImageCompressor.lap(details, 'total', start)
+    stat = {
+        'original_size': len(data),
+        'compressed_size': buffer.getbuffer().nbytes,
+        'format': output_format,
+        'extension': ImageCompressor.extension_for(output_format)
+    }
+    stat.update(details)
+    return buffer, stat
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+else:
+    _UnixHTTPServer = None
+
+
+class CompressionDaemon:
+    # Keeps a pool of worker processes with Pillow already loaded and serves
+    # jobs over HTTP, on localhost TCP or a Unix socket:
+    #   POST /compress  JSON {"files": [...], "output_folder": ..., options} -> {"results": [stat, ...]}
+    #   POST /encode?options  raw image bytes -> compressed bytes, stat in the X-QuickPress-Stats header
+    #   GET  /health, GET /metrics (?format=prometheus)
+    # Web pages can reach localhost too, so over TCP every request must carry the
+    # per-instance token from the token file (readable only by its owner), no
+    # browser Origin, a loopback Host when listening on loopback, and a body of
+    # the declared type. A Unix socket is only opened to its owner instead.
+    # Every request runs on its own thread and waits on pool futures, so
+    # requests overlap freely; a file slot limit bounds queued work, and files
+    # that cannot get a slot in time are answered with a "busy" error
+    JOBS_PER_WORKER = 4
+    ADMIT_TIMEOUT = 30
+    MAX_BODY_BYTES = 256 * 1024 * 1024
+    FORMATS = ("same", "JPEG", "PNG", "WEBP", ImageCompressor.SMALLEST)
+    LOOPBACK_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        host: str = DaemonClient.DEFAULT_HOST,
+        port: int = DaemonClient.DEFAULT_PORT,
+        socket_path: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        token_file: Optional[str] = None
+    ):
+        self.workers = BatchCompressor(workers).workers
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self.max_pending = max_pending or self.workers * CompressionDaemon.JOBS_PER_WORKER
+        self.token_file = token_file
+        self.token: Optional[str] = None
+        self.metrics = MetricsRegistry()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._server = None
+
+    def start(self) -> None:
+        self._executor = self._start_pool()
+        handler = type('Handler', (_RequestHandler,), {'daemon': self})
+        if self.socket_path:
+            if _UnixHTTPServer is None or not hasattr(socket, 'AF_UNIX'):
+                raise Exception("Error starting daemon: Unix sockets are not available on this platform")
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self._server = _UnixHTTPServer(self.socket_path, handler)
+            os.chmod(self.socket_path, 0o600)
+        else:
+            self._server = ThreadingHTTPServer((self.host, self.port), handler)
+            self._server.daemon_threads = True
+            self.port = self._server.server_address[1]
+            self.token = secrets.token_urlsafe(32)
+            self.token_file = self.token_file or DaemonClient.token_path(self.port)
+            self._write_token()
+
+    def serve_forever(self) -> None:
+        if self._server is None:
+            self.start()
+        try:
+            self._server.serve_forever()
+        finally:
+            self.close()
+
+    def shutdown(self) -> None:
+        # Safe to call from another thread while serve_forever runs
+        if self._server:
+            self._server.shutdown()
+
+    def close(self) -> None:
+        if self._server:
+            self._server.server_close()
+            self._server = None
+            if self.socket_path and os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            if self.token and os.path.exists(self.token_file):
+                os.remove(self.token_file)
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _write_token(self) -> None:
+        os.makedirs(os.path.dirname(self.token_file) or ".", exist_ok=True)
+        if os.path.exists(self.token_file):
+            os.remove(self.token_file)
+        # Created owner-only from the start, so the token is never readable by others
+        with os.fdopen(os.open(self.token_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'w') as f:
+            f.write(self.token)
+
+    def check_request(self, headers) -> Optional[Tuple[int, str]]:
+        # The reason a request is refused, as (status, message), or None to serve it
+        if self.socket_path:
+            return None
+        if headers.get('Origin') is not None:
+            return 403, "Requests from web pages are not accepted"
+        host = urlsplit(f"//{headers.get('Host', '')}").hostname
+        if self.host in CompressionDaemon.LOOPBACK_HOSTS and host not in CompressionDaemon.LOOPBACK_HOSTS:
+            return 403, f"Unexpected Host {headers.get('Host')}"
+        if not hmac.compare_digest(headers.get(DaemonClient.TOKEN_HEADER, ''), self.token):
+            return 401, f"Missing or wrong {DaemonClient.TOKEN_HEADER} header (the token is in {self.token_file})"
+        return None
+
+    @property
+    def address(self) -> str:
+        return self.socket_path or f"http://{self.host}:{self.port}"
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+            initargs=(self.cache_dir, self.cache_max_bytes)
+        )
+        # Workers are spawned on demand, so start them all now rather than on the first jobs
+        wait([executor.submit(_ping) for _ in range(self.workers)])
+        return executor
+
+    def submit(self, function, *args) -> Optional[Future]:
+        if not self._slots.acquire(timeout=CompressionDaemon.ADMIT_TIMEOUT):
+            return None
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._submit(function, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _submit(self, function, *args) -> Future:
+        executor = self._executor
+        try:
+            return executor.submit(function, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); replace the pool once and carry on
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = self._start_pool()
+                    executor.shutdown(wait=False, cancel_futures=True)
+            return self._executor.submit(function, *args)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def health(self) -> Dict:
+        with self._lock:
+            pending = self._pending
+        return {'status': 'ok', 'workers': self.workers, 'pending': pending, 'max_pending': self.max_pending}
+
+    def compress_files(self, files: List[str], output_folder: str, options: Dict) -> List[Dict]:
+        # Files of one request are all queued before any is awaited, so they encode in parallel
+        futures = []
+        for file_path in files:
+            futures.append((file_path, self.submit(_compress_path, file_path, output_folder, options)))
+
+        results = []
+        for file_path, future in futures:
+            if future is None:
+                stat = {'file': file_path, 'error': f"Error compressing image {file_path}: daemon is busy"}
+            else:
+                try:
+                    stat = future.result()
+                except Exception as e:
+                    stat = {'file': file_path, 'error': f"Error compressing image {file_path}: {str(e)}"}
+            self.metrics.record(stat)
+            results.append(stat)
+        return results
+
+    def compress_bytes(self, data: bytes, options: Dict) -> Tuple[Optional[io.BytesIO], Dict]:
+        future = self.submit(_compress_bytes, data, options)
+        if future is None:
+            return None, {'error': "Error compressing image: daemon is busy"}
+        buffer, stat = future.result()
+        self.metrics.record(stat)
+        return buffer, stat
+
+    @staticmethod
+    def parse_options(values: Dict) -> Dict:
+        options = {
+            'quality': ImageCompressor.QUALITY_LEVELS["medium"],
+            'output_format': "same",
+            'target_size': None,
+            'max_dimension': None,
+            'scale': None,
+            'overwrite': True,
+            'probes': 1,
+            'min_ssim': None,
+            'png_colors': None
+        }
+        try:
+            if values.get('quality') is not None:
+                quality = values['quality']
+                if isinstance(quality, str) and quality.lower() in ImageCompressor.QUALITY_LEVELS:
+                    quality = ImageCompressor.QUALITY_LEVELS[quality.lower()]
+                options['quality'] = int(quality)
+                if not ImageCompressor.MIN_QUALITY <= options['quality'] <= ImageCompressor.MAX_QUALITY:
+                    raise ValueError("quality must be between 1 and 95")
+            if values.get('output_format') is not None:
+                if values['output_format'] not in CompressionDaemon.FORMATS:
+                    raise ValueError(f"output_format must be one of {', '.join(CompressionDaemon.FORMATS)}")
+                options['output_format'] = values['output_format']
+            if values.get('target_size') is not None:
+                options['target_size'] = float(values['target_size'])
+            if values.get('max_dimension') is not None:
+                options['max_dimension'] = int(values['max_dimension'])
+            if values.get('scale') is not None:
+                options['scale'] = float(values['scale'])
+                if not 0 < options['scale'] <= 1:
+                    raise ValueError("scale must be greater than 0 and at most 1")
+            if values.get('min_ssim') is not None:
+                options['min_ssim'] = float(values['min_ssim'])
+                if not 0 < options['min_ssim'] < 1:
+                    raise ValueError("min_ssim must be greater than 0 and less than 1")
+                if values.get('quality') is None:
+                    # The search picks the quality, so only cap it at the top unless asked otherwise
+                    options['quality'] = ImageCompressor.MAX_QUALITY
+            if values.get('png_colors') is not None:
+                options['png_colors'] = int(values['png_colors'])
+                if not PngOptimizer.MIN_COLORS <= options['png_colors'] <= PngOptimizer.MAX_COLORS:
+                    raise ValueError("png_colors must be between 2 and 256")
+            if values.get('probes') is not None:
+                options['probes'] = max(1, int(values['probes']))
+            if values.get('overwrite') is not None:
+                overwrite = values['overwrite']
+                options['overwrite'] = overwrite if isinstance(overwrite, bool) else str(overwrite).lower() in ('1', 'true', 'yes')
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid options: {str(e)}")
+        return options
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "QuickPress"
+    daemon: CompressionDaemon = None
+
+    def address_string(self) -> str:
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        pass
+
+    def refuse(self, body_types: Tuple[str, ...] = ()) -> bool:
+        refusal = self.daemon.check_request(self.headers)
+        content_type = self.headers.get_content_type()
+        if refusal is None and body_types and not any(
+            content_type == body_type or body_type.endswith('/*') and content_type.startswith(body_type[:-1])
+            for body_type in body_types
+        ):
+            refusal = 415, f"Content-Type must be {' or '.join(body_types)}"
+        if refusal is None:
+            return False
+        # The body is unread, so the connection cannot be reused
+        self.close_connection = True
+        self.send_json(refusal[0], {'error': refusal[1]})
+        return True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if self.refuse():
+            return
+        if url.path == "/health":
+            self.send_json(200, self.daemon.health())
+        elif url.path == "/metrics":
+            snapshot = self.daemon.metrics.snapshot()
+            if dict(parse_qsl(url.query)).get('format') == "prometheus":
+                self.send_body(200, MetricsRegistry.to_prometheus(snapshot).encode(), "text/plain; version=0.0.4")
+            else:
+                self.send_json(200, snapshot)
+        else:
+            self.send_json(404, {'error': f"Unknown path {url.path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        # Simple cross-site requests can only send form or text bodies, so requiring
+        # these types also keeps pages from posting without a CORS preflight
+        body_types = {'/compress': ("application/json",), '/encode': ("application/octet-stream", "image/*")}
+        if self.refuse(body_types.get(url.path, ())):
+            return
+        try:
+            data = self.read_body()
+            if url.path == "/compress":
+                request = json.loads(data)
+                files = request.get('files')
+                if not isinstance(files, list) or not all(isinstance(file_path, str) for file_path in files):
+                    raise ValueError("files must be a list of paths")
+                options = CompressionDaemon.parse_options(request)
+                output_folder = request.get('output_folder') or ""
+                if output_folder:
+                    os.makedirs(output_folder, exist_ok=True)
+                results = self.daemon.compress_files(files, output_folder, options)
+                busy = results and all('daemon is busy' in stat.get('error', '') for stat in results)
+                self.send_json(503 if busy else 200, {'results': results})
+            elif url.path == "/encode":
+                options = CompressionDaemon.parse_options(dict(parse_qsl(url.query)))
+                buffer, stat = self.daemon.compress_bytes(data, options)
+                if buffer is None:
+                    self.send_json(503 if 'daemon is busy' in stat['error'] else 422, stat)
+                else:
+                    self.send_body(200, buffer.getbuffer(), "application/octet-stream", {
+                        DaemonClient.STATS_HEADER: json.dumps(stat)
+                    })
+            else:
+                self.send_json(404, {'error': f"Unknown path {url.path}"})
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+
+    def read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > CompressionDaemon.MAX_BODY_BYTES:
+            # The body is left unread, so the connection cannot be reused
+            self.close_connection = True
+            raise ValueError(f"Request body larger than {CompressionDaemon.MAX_BODY_BYTES} bytes")
+        return self.rfile.read(length)
+
+    def send_json(self, status: int, body: Dict) -> None:
+        self.send_body(status, json.dumps(body).encode(), "application/json")
+
+    def send_body(self, status: int, body, content_type: str, headers: Optional[Dict] = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
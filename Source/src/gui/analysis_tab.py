@@ -1,12 +1,30 @@
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, filedialog, messagebox
+from PIL import ImageTk
 from src.utils.stats import StatsManager
 
 class AnalysisTab(ttk.Frame):
+    CHART_MODES = {
+        "Automatic": "auto",
+        "Top files by savings": "files",
+        "Compression ratio histogram": "histogram",
+        "Totals by format": "formats"
+    }
+    RENDER_POLL_MS = 50
+    RESIZE_DELAY_MS = 200
+    
     def __init__(self, parent, shared_data):
         super().__init__(parent)
         self.shared_data = shared_data
+        # Charts render on one background thread; only the newest request is shown
+        self.render_executor = ThreadPoolExecutor(max_workers=1)
+        self.render_id = 0
+        self.rendered_key = None
+        self.resize_job = None
+        self.chart_image = None
         self.setup_ui()
+        self.bind('<Map>', lambda e: self.update_statistics())
         
     def setup_ui(self):
         self.setup_export_frame()
@@ -35,22 +53,69 @@ class AnalysisTab(ttk.Frame):
         self.stats_frame = ttk.Frame(self)
         self.stats_frame.pack(fill='both', expand=True, padx=10, pady=5)
         
+        mode_frame = ttk.Frame(self.stats_frame)
+        mode_frame.pack(fill='x', pady=(0, 5))
+        
+        ttk.Label(mode_frame, text="Chart:").pack(side=tk.LEFT)
+        self.chart_mode = tk.StringVar(value="Automatic")
+        mode_box = ttk.Combobox(
+            mode_frame,
+            textvariable=self.chart_mode,
+            values=list(self.CHART_MODES),
+            state='readonly',
+            width=30
+        )
+        mode_box.pack(side=tk.LEFT, padx=5)
+        mode_box.bind('<<ComboboxSelected>>', lambda e: self.update_statistics())
+        
         self.canvas_container = ttk.Frame(self.stats_frame)
         self.canvas_container.pack(fill='both', expand=True)
         
+        self.chart_label = ttk.Label(self.canvas_container, anchor='center')
+        self.chart_label.pack(fill='both', expand=True)
+        self.canvas_container.bind('<Configure>', self.schedule_resize)
+        
+    def schedule_resize(self, event=None):
+        if self.resize_job is not None:
+            self.after_cancel(self.resize_job)
+        self.resize_job = self.after(self.RESIZE_DELAY_MS, self.update_statistics)
+        
     def update_statistics(self):
-        for widget in self.canvas_container.winfo_children():
-            widget.destroy()
-            
-        if self.shared_data['compression_stats']:
-            try:
-                stats_widget = StatsManager.create_statistics_plots(
-                    self.shared_data['compression_stats'],
-                    self.canvas_container
-                )
-                stats_widget.pack(fill='both', expand=True)
-            except Exception as e:
-                messagebox.showerror("Error", f"Error updating statistics: {str(e)}")
+        self.resize_job = None
+        stats = self.shared_data['compression_stats']
+        if not stats:
+            self.rendered_key = None
+            self.chart_image = None
+            self.chart_label.config(image='', text="No compression data yet.")
+            return
+        
+        size = (
+            max(400, self.canvas_container.winfo_width()),
+            max(300, self.canvas_container.winfo_height())
+        )
+        mode = self.CHART_MODES.get(self.chart_mode.get(), "auto")
+        key = (id(stats), len(stats), mode, size)
+        if key == self.rendered_key:
+            return
+        self.rendered_key = key
+        
+        self.render_id += 1
+        future = self.render_executor.submit(StatsManager.render_statistics, list(stats), mode, size)
+        self.after(self.RENDER_POLL_MS, self.poll_render, future, self.render_id)
+        
+    def poll_render(self, future, render_id):
+        if not future.done():
+            self.after(self.RENDER_POLL_MS, self.poll_render, future, render_id)
+            return
+        if render_id != self.render_id:
+            return
+        
+        try:
+            self.chart_image = ImageTk.PhotoImage(future.result())
+            self.chart_label.config(image=self.chart_image, text='')
+        except Exception as e:
+            self.rendered_key = None
+            messagebox.showerror("Error", f"Error updating statistics: {str(e)}")
         
     def export_to_csv(self):
         if not self.shared_data['compression_stats']:
@@ -60,7 +125,7 @@ class AnalysisTab(ttk.Frame):
         try:
             filepath = filedialog.asksaveasfilename(
                 defaultextension=".csv",
-                filetypes=[("CSV files", "*.csv")]
+                filetypes=[("CSV files", "*.csv"), ("Compressed CSV files", "*.csv.gz")]
             )
             if filepath:
                 StatsManager.export_to_csv(self.shared_data['compression_stats'], filepath)
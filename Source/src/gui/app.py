@@ -1,8 +1,10 @@
+import os
 import tkinter as tk
 from tkinter import ttk
 from src.gui.main_tab import MainTab
 from src.gui.settings_tab import SettingsTab
 from src.gui.analysis_tab import AnalysisTab
+from src.gui.file_list import FileListModel
 
 class ImageCompressor:
     def __init__(self, root):
@@ -47,13 +49,22 @@ class ImageCompressor:
         self.notebook.pack(expand=True, fill='both', padx=20, pady=10)
         
         self.shared_data = {
-            'selected_files': [],
+            'selected_files': FileListModel(),
             'compression_stats': [],
             'output_folder': "",
             'compression_quality': tk.StringVar(value="medium"),
             'target_size': tk.StringVar(value=""),
             'use_target_size': tk.BooleanVar(value=False),
-            'output_format': tk.StringVar(value="same")
+            'target_mode': tk.StringVar(value="file"),
+            'output_format': tk.StringVar(value="same"),
+            'quantize_png': tk.BooleanVar(value=False),
+            'workers': tk.IntVar(value=os.cpu_count() or 1),
+            'use_cache': tk.BooleanVar(value=False),
+            'overwrite': tk.BooleanVar(value=True),
+            'skip_duplicates': tk.BooleanVar(value=False),
+            'match_similar': tk.BooleanVar(value=False),
+            'max_dimension': tk.StringVar(value=""),
+            'scale_percent': tk.IntVar(value=100)
         }
         
         self.main_tab = MainTab(self.notebook, self.shared_data)
@@ -0,0 +1,145 @@
+import os
+import tkinter as tk
+import tkinter.font as tkfont
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+
+class FileListModel:
+    def __init__(self):
+        self._files: List[str] = []
+        self._keys = set()
+        self._listeners: List[Callable[[], None]] = []
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.normcase(os.path.abspath(file_path))
+
+    def subscribe(self, listener: Callable[[], None]) -> None:
+        self._listeners.append(listener)
+
+    def _notify(self) -> None:
+        for listener in self._listeners:
+            listener()
+
+    def add(self, file_paths: Iterable[str]) -> List[str]:
+        added = []
+        for file_path in file_paths:
+            key = FileListModel._key(file_path)
+            if key in self._keys:
+                continue
+            self._keys.add(key)
+            self._files.append(file_path)
+            added.append(file_path)
+        if added:
+            self._notify()
+        return added
+
+    def remove(self, indices: Iterable[int]) -> None:
+        doomed = set(indices)
+        if not doomed:
+            return
+        for index in doomed:
+            self._keys.discard(FileListModel._key(self._files[index]))
+        self._files = [file_path for index, file_path in enumerate(self._files) if index not in doomed]
+        self._notify()
+
+    def clear(self) -> None:
+        self._files = []
+        self._keys = set()
+        self._notify()
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._files)
+
+    def __getitem__(self, index):
+        return self._files[index]
+
+    def __contains__(self, file_path: str) -> bool:
+        return FileListModel._key(file_path) in self._keys
+
+
+class VirtualFileList(tk.Frame):
+    # Only the rows that fit on screen exist in the Listbox; scrolling re-renders
+    # that window from the model, so the widget cost does not grow with the list
+    def __init__(self, parent, model: FileListModel, **listbox_options):
+        super().__init__(parent, bg=parent.cget('bg'))
+        self.model = model
+        self.top = 0
+        self.selected: Optional[int] = None
+
+        self.listbox = tk.Listbox(self, selectmode=tk.SINGLE, exportselection=False, **listbox_options)
+        self.listbox.pack(side=tk.LEFT, fill='both', expand=True)
+
+        self.scrollbar = tk.Scrollbar(self, command=self.handle_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill='y')
+
+        font = tkfont.Font(font=self.listbox.cget('font'))
+        self.row_height = font.metrics('linespace') + 1
+
+        self.listbox.bind('<Configure>', lambda e: self.render())
+        self.listbox.bind('<<ListboxSelect>>', self.handle_select)
+        self.listbox.bind('<MouseWheel>', self.handle_wheel)
+        self.listbox.bind('<Button-4>', lambda e: self.scroll_to(self.top - 3))
+        self.listbox.bind('<Button-5>', lambda e: self.scroll_to(self.top + 3))
+        self.model.subscribe(self.render)
+
+    def visible_rows(self) -> int:
+        return max(1, self.listbox.winfo_height() // self.row_height)
+
+    def visible_range(self) -> Tuple[int, int]:
+        return self.top, min(len(self.model), self.top + self.visible_rows())
+
+    def index_at(self, y: int) -> Optional[int]:
+        row = self.listbox.nearest(y)
+        bbox = self.listbox.bbox(row)
+        if not bbox or not (bbox[1] <= y <= bbox[1] + bbox[3]):
+            return None
+        return self.top + row
+
+    def row_bbox(self, index: int) -> Optional[Tuple[int, int, int, int]]:
+        return self.listbox.bbox(index - self.top)
+
+    def scroll_to(self, top: int) -> None:
+        top = max(0, min(top, len(self.model) - self.visible_rows()))
+        if top != self.top:
+            self.top = top
+            self.render()
+
+    def render(self) -> None:
+        self.top = max(0, min(self.top, len(self.model) - self.visible_rows()))
+        start, end = self.visible_range()
+
+        self.listbox.delete(0, tk.END)
+        if end > start:
+            self.listbox.insert(tk.END, *(os.path.basename(file_path) for file_path in self.model[start:end]))
+
+        if self.selected is not None and self.selected >= len(self.model):
+            self.selected = None
+        if self.selected is not None and start <= self.selected < end:
+            self.listbox.selection_set(self.selected - start)
+
+        total = len(self.model)
+        if total:
+            self.scrollbar.set(start / total, end / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def handle_scroll(self, action: str, value: str, unit: Optional[str] = None) -> None:
+        if action == 'moveto':
+            self.scroll_to(int(float(value) * len(self.model)))
+        elif action == 'scroll':
+            step = self.visible_rows() if unit == 'pages' else 1
+            self.scroll_to(self.top + int(value) * step)
+
+    def handle_wheel(self, event) -> None:
+        self.scroll_to(self.top + (-3 if event.delta > 0 else 3))
+
+    def handle_select(self, event=None) -> None:
+        rows = self.listbox.curselection()
+        self.selected = self.top + rows[0] if rows else None
+
+    def curselection(self) -> Tuple[int, ...]:
+        return (self.selected,) if self.selected is not None else ()
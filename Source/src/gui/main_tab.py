@@ -1,22 +1,48 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from tkinterdnd2 import DND_FILES
-import threading
 import os
+import queue
+import threading
+from src.core.cache import ResultCache
 from src.core.compressor import ImageCompressor
+from src.core.duplicates import DuplicateFinder
 from src.core.file_handler import FileHandler
+from src.core.perceptual import PerceptualGuard
+from src.core.png import PngOptimizer
+from src.core.scheduler import JobScheduler
 from src.utils.stats import StatsManager
-from PIL import Image, ImageTk, ImageGrab
+from src.utils.thumbnails import ThumbnailCache
+from src.gui.file_list import VirtualFileList
+from PIL import Image, ImageTk
 
 class MainTab(ttk.Frame):
+    PREVIEW_POLL_MS = 30
+    PREVIEW_MAX_POLLS = 200
+    PREFETCH_MARGIN = 10
+    # Progress from the batch thread is drawn at most this often
+    PROGRESS_POLL_MS = 100
+    # Files found by a folder scan are added to the list in batches this often
+    SCAN_POLL_MS = 100
+    SCAN_BATCH = 5000
+    
     def __init__(self, parent, shared_data):
         super().__init__(parent)
         self.shared_data = shared_data
+        self.preview_window = None
+        self._hover_path = None
+        self._hover_y = 0
+        self._preview_poll = None
+        self._preview_polls = 0
+        self._progress_poll = None
+        self._total_files = 0
+        self._scans = 0
+        self.scheduler = JobScheduler()
+        self.thumbnails = ThumbnailCache(disk_dir=os.path.join(ResultCache.default_dir(), "thumbnails"))
         self.setup_ui()
         self.setup_drag_drop()
         self.setup_clipboard()
         self.setup_delete_binding()
-        self.preview_window = None
         
     def setup_ui(self):
         self.status_label = tk.Label(
@@ -30,26 +56,22 @@ class MainTab(ttk.Frame):
         self.setup_file_list()
         self.setup_buttons()
         self.progress = ttk.Progressbar(self, orient='horizontal', mode='determinate', length=300)
+        self.setup_control_buttons()
         
     def setup_file_list(self):
         list_frame = tk.Frame(self, bg="#f0f0f0")
         list_frame.pack(fill='both', expand=True, pady=5)
         
-        self.files_listbox = tk.Listbox(
+        self.file_list = VirtualFileList(
             list_frame,
+            self.shared_data['selected_files'],
             width=50,
             height=8,
-            selectmode=tk.SINGLE,
             font=("Helvetica", 10),
             bg="white"
         )
-        self.files_listbox.pack(side=tk.LEFT, fill='both', expand=True)
-        
-        scrollbar = tk.Scrollbar(list_frame)
-        scrollbar.pack(side=tk.RIGHT, fill='y')
-        
-        self.files_listbox.config(yscrollcommand=scrollbar.set)
-        scrollbar.config(command=self.files_listbox.yview)
+        self.file_list.pack(fill='both', expand=True)
+        self.files_listbox = self.file_list.listbox
         
         self.files_listbox.bind('<Motion>', self.create_preview)
         self.files_listbox.bind('<Leave>', self.hide_preview)
@@ -98,6 +120,35 @@ class MainTab(ttk.Frame):
                 pady=5
             ).pack(side=tk.LEFT, padx=5)
     
+    def setup_control_buttons(self):
+        self.control_frame = tk.Frame(self, bg="#f0f0f0")
+        
+        self.pause_button = tk.Button(
+            self.control_frame,
+            text="Pause",
+            command=self.toggle_pause,
+            bg="#FF9800",
+            fg="white",
+            font=("Helvetica", 10),
+            relief=tk.FLAT,
+            padx=15,
+            pady=5
+        )
+        self.pause_button.pack(side=tk.LEFT, padx=5)
+        
+        self.cancel_button = tk.Button(
+            self.control_frame,
+            text="Cancel",
+            command=self.cancel_compression,
+            bg="#FF5252",
+            fg="white",
+            font=("Helvetica", 10),
+            relief=tk.FLAT,
+            padx=15,
+            pady=5
+        )
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+        
     def setup_drag_drop(self):
         self.drop_target_register(DND_FILES)
         self.dnd_bind('<<Drop>>', self.handle_drop)
@@ -115,7 +166,7 @@ class MainTab(ttk.Frame):
             if isinstance(clipboard_content, Image.Image):
                 temp_path = os.path.join(os.path.expanduser('~'), '.quickpress_temp.png')
                 clipboard_content.save(temp_path)
-                self.shared_data['selected_files'].append(temp_path)
+                self.shared_data['selected_files'].add([temp_path])
                 self.update_file_list()
                 return
             
@@ -126,7 +177,7 @@ class MainTab(ttk.Frame):
                         valid_files.append(item)
                 
                 if valid_files:
-                    self.shared_data['selected_files'].extend(valid_files)
+                    self.shared_data['selected_files'].add(valid_files)
                     self.update_file_list()
                     return
                 
@@ -141,7 +192,7 @@ class MainTab(ttk.Frame):
                         valid_files.append(path)
                     
                 if valid_files:
-                    self.shared_data['selected_files'].extend(valid_files)
+                    self.shared_data['selected_files'].add(valid_files)
                     self.update_file_list()
                     return
                 
@@ -161,7 +212,7 @@ class MainTab(ttk.Frame):
             ]
             files = filedialog.askopenfilenames(filetypes=filetypes)
             if files:
-                self.shared_data['selected_files'].extend(list(files))
+                self.shared_data['selected_files'].add(files)
                 self.update_file_list()
         except Exception as e:
             messagebox.showerror("Error", f"Error selecting files: {str(e)}")
@@ -170,44 +221,83 @@ class MainTab(ttk.Frame):
         try:
             folder_path = filedialog.askdirectory()
             if folder_path:
-                new_files = FileHandler.get_files_from_folder(folder_path)
-                self.shared_data['selected_files'].extend(new_files)
-                self.update_file_list()
+                self.scan_folders([folder_path])
         except Exception as e:
             messagebox.showerror("Error", f"Error selecting folder: {str(e)}")
             
     def handle_drop(self, event):
         try:
-            valid_files, invalid_files = FileHandler.parse_dropped_files(event.data)
+            valid_files, invalid_files, folders = FileHandler.parse_dropped_files(event.data)
             if invalid_files:
                 messagebox.showwarning(
                     "Warning",
                     f"Some files were skipped as they are not valid images:\n{', '.join(invalid_files)}"
                 )
             if valid_files:
-                self.shared_data['selected_files'].extend(valid_files)
+                self.shared_data['selected_files'].add(valid_files)
                 self.update_file_list()
+            if folders:
+                self.scan_folders(folders)
         except Exception as e:
             messagebox.showerror("Error", f"Error handling dropped files: {str(e)}")
             
+    def scan_folders(self, folders):
+        # Folders are listed on a thread; poll_scan drains what it finds from the Tk loop
+        found = queue.Queue()
+        
+        def scan():
+            try:
+                for folder in folders:
+                    for entry in FileHandler.scan_folder(folder):
+                        found.put(entry.path)
+            finally:
+                found.put(None)
+                
+        self._scans += 1
+        threading.Thread(target=scan, daemon=True).start()
+        self.update_file_list()
+        self.after(self.SCAN_POLL_MS, self.poll_scan, found)
+        
+    def poll_scan(self, found):
+        files = []
+        finished = False
+        while len(files) < self.SCAN_BATCH:
+            try:
+                file_path = found.get_nowait()
+            except queue.Empty:
+                break
+            if file_path is None:
+                finished = True
+                break
+            files.append(file_path)
+            
+        if finished:
+            self._scans -= 1
+        if files:
+            self.shared_data['selected_files'].add(files)
+        if files or finished:
+            self.update_file_list()
+        if not finished:
+            self.after(self.SCAN_POLL_MS, self.poll_scan, found)
+            
     def update_file_list(self):
-        self.files_listbox.delete(0, tk.END)
-        for file in self.shared_data['selected_files']:
-            self.files_listbox.insert(tk.END, os.path.basename(file))
+        if self.scheduler.running:
+            return
         total_files = len(self.shared_data['selected_files'])
+        scanning = " (scanning folders...)" if self._scans else ""
         self.status_label.config(
-            text=f"Selected: {total_files} {'file' if total_files == 1 else 'files'}",
+            text=f"Selected: {total_files} {'file' if total_files == 1 else 'files'}{scanning}",
             fg="#333333"
         )
         
     def remove_selected(self):
-        selected_indices = self.files_listbox.curselection()
+        selected_indices = self.file_list.curselection()
         if not selected_indices:
             messagebox.showinfo("Info", "Please select files to remove")
             return
         
-        for index in sorted(selected_indices, reverse=True):
-            self.shared_data['selected_files'].pop(index)
+        self.file_list.selected = None
+        self.shared_data['selected_files'].remove(selected_indices)
         
         self.update_file_list()
         
@@ -221,65 +311,181 @@ class MainTab(ttk.Frame):
             self.update_file_list()
             
     def start_compression(self):
+        if self.scheduler.running:
+            return
+        if self._scans:
+            messagebox.showwarning("Warning", "Please wait until the folder scan has finished!")
+            return
         if not self.shared_data['selected_files']:
             messagebox.showwarning("Warning", "Please select at least one image!")
             return
-            
+        
+        # Settings are read here on the Tk thread; the batch itself only posts events back
+        try:
+            options = self.compression_options()
+        except ValueError as e:
+            messagebox.showerror("Error", f"Error during compression: {str(e)}")
+            return
+        
+        files = list(self.shared_data['selected_files'])
+        self.shared_data['compression_stats'] = []
+        self._total_files = len(files)
         self.progress.pack()
         self.progress['value'] = 0
-        self.progress['maximum'] = len(self.shared_data['selected_files'])
+        self.progress['maximum'] = self._total_files
+        self.pause_button.config(text="Pause", state=tk.NORMAL)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.control_frame.pack(pady=5)
+        self.update_progress(0)
+        
+        self.scheduler.submit(files, **options)
+        self._progress_poll = self.after(self.PROGRESS_POLL_MS, self.poll_progress)
+        
+    def compression_options(self):
+        # Visually lossless searches downwards from the top quality for the lowest one that still looks the same
+        quality_level = self.shared_data['compression_quality'].get()
+        perceptual = quality_level == "perceptual"
+        quality = ImageCompressor.MAX_QUALITY if perceptual else ImageCompressor.QUALITY_LEVELS[quality_level]
+        
+        target_size = None
+        if self.shared_data['use_target_size'].get():
+            try:
+                target_mb = float(self.shared_data['target_size'].get())
+                target_size = target_mb * 1024 * 1024
+            except ValueError:
+                raise ValueError("Please enter a valid target size in MB")
         
-        compression_thread = threading.Thread(target=self.compress_images, daemon=True)
-        compression_thread.start()
+        max_dimension = None
+        if self.shared_data['max_dimension'].get().strip():
+            try:
+                max_dimension = int(self.shared_data['max_dimension'].get())
+                if max_dimension < 1:
+                    raise ValueError
+            except ValueError:
+                raise ValueError("Please enter a valid maximum size in pixels")
         
-    def compress_images(self):
         try:
-            self.shared_data['compression_stats'] = []
-            
-            quality_levels = {"high": 90, "medium": 60, "low": 30}
-            quality = quality_levels[self.shared_data['compression_quality'].get()]
-            
-            target_size = None
-            if self.shared_data['use_target_size'].get():
-                try:
-                    target_mb = float(self.shared_data['target_size'].get())
-                    target_size = target_mb * 1024 * 1024
-                except ValueError:
-                    raise ValueError("Please enter a valid target size in MB")
-            
-            for index, file_path in enumerate(self.shared_data['selected_files']):
-                stat = ImageCompressor.compress_image(
-                    file_path=file_path,
-                    output_folder=self.shared_data['output_folder'] or os.path.dirname(file_path),
-                    quality=quality,
-                    output_format=self.shared_data['output_format'].get(),
-                    target_size=target_size
-                )
-                self.shared_data['compression_stats'].append(stat)
-                self.update_progress(index + 1)
-            
-            self.compression_complete()
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Error during compression: {str(e)}")
-        finally:
-            self.progress.pack_forget()
-            
+            scale_percent = self.shared_data['scale_percent'].get()
+        except tk.TclError:
+            raise ValueError("Please enter a scale between 1 and 100%")
+        if not 1 <= scale_percent <= 100:
+            raise ValueError("Please enter a scale between 1 and 100%")
+        
+        try:
+            workers = self.shared_data['workers'].get()
+        except tk.TclError:
+            raise ValueError("Please enter a whole number of worker processes")
+        if workers < 1:
+            raise ValueError("Please enter at least 1 worker process")
+        
+        options = dict(
+            workers=workers,
+            output_folder=self.shared_data['output_folder'],
+            quality=quality,
+            output_format=self.shared_data['output_format'].get(),
+            ordered=False,
+            cache_dir=ResultCache.default_dir() if self.shared_data['use_cache'].get() else None,
+            overwrite=self.shared_data['overwrite'].get(),
+            max_dimension=max_dimension,
+            scale=scale_percent / 100 if scale_percent < 100 else None,
+            png_colors=PngOptimizer.MAX_COLORS if self.shared_data['quantize_png'].get() else None
+        )
+        if self.shared_data['skip_duplicates'].get():
+            options['dedupe'] = DuplicateFinder.SIMILAR if self.shared_data['match_similar'].get() else DuplicateFinder.EXACT
+        if target_size and self.shared_data['target_mode'].get() == "batch":
+            options['total_size'] = target_size
+        else:
+            options['target_size'] = target_size
+            options['min_ssim'] = PerceptualGuard.DEFAULT_MIN_SSIM if perceptual else None
+        return options
+        
+    def poll_progress(self):
+        self._progress_poll = None
+        done = None
+        for event in self.scheduler.drain():
+            if event[0] == 'status':
+                self.status_label.config(text=event[1])
+            elif event[0] == 'progress':
+                done = event[1]
+            elif event[0] == 'finished':
+                _, stats, failed, cancelled = event
+                self.shared_data['compression_stats'] = stats
+                self.compression_finished()
+                self.compression_complete(failed, cancelled)
+                return
+            elif event[0] == 'error':
+                self.compression_finished()
+                messagebox.showerror("Error", f"Error during compression: {event[1]}")
+                return
+        
+        # Only the latest count is drawn, however many files finished since the last poll
+        if done is not None:
+            self.update_progress(done)
+        self._progress_poll = self.after(self.PROGRESS_POLL_MS, self.poll_progress)
+        
     def update_progress(self, value):
         self.progress['value'] = value
-        self.status_label.config(text=f"Compressing... ({value}/{len(self.shared_data['selected_files'])})")
+        state = "Paused" if self.scheduler.paused else "Compressing..."
+        self.status_label.config(text=f"{state} ({value}/{self._total_files})")
         
-    def compression_complete(self):
+    def toggle_pause(self):
+        if self.scheduler.paused:
+            self.scheduler.resume()
+            self.pause_button.config(text="Pause")
+        else:
+            self.scheduler.pause()
+            self.pause_button.config(text="Resume")
+        self.update_progress(int(self.progress['value']))
+        
+    def cancel_compression(self):
+        self.scheduler.cancel()
+        self.pause_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.DISABLED)
+        self.status_label.config(text="Cancelling... (files being encoded will finish first)")
+        
+    def compression_finished(self):
+        self.progress.pack_forget()
+        self.control_frame.pack_forget()
+        self.status_label.config(text="Drag & drop images or press Ctrl+V to paste")
+        
+    def compression_complete(self, failed=None, cancelled=False):
+        if failed:
+            messagebox.showwarning(
+                "Warning",
+                f"{len(failed)} {'file' if len(failed) == 1 else 'files'} could not be compressed:\n"
+                + "\n".join(stat['error'] for stat in failed[:10])
+            )
+            
         if not self.shared_data['compression_stats']:
             return
             
         total_original = sum(stat['original_size'] for stat in self.shared_data['compression_stats'])
         total_compressed = sum(stat['compressed_size'] for stat in self.shared_data['compression_stats'])
         compression_percent = ((total_original - total_compressed) / total_original) * 100
+        duplicates = sum(1 for stat in self.shared_data['compression_stats'] if stat.get('duplicate_of'))
+        similar = [stat for stat in self.shared_data['compression_stats'] if stat.get('pixels_from')]
+        unmet = [stat for stat in self.shared_data['compression_stats'] if stat.get('ssim_met') is False]
         
+        if cancelled:
+            summary = f"Compression cancelled after {len(self.shared_data['compression_stats'])} of {self._total_files} images."
+        else:
+            summary = f"{'All images' if not failed else 'Remaining images'} compressed successfully!"
+        if duplicates:
+            summary += f"\n{duplicates} duplicate {'image was' if duplicates == 1 else 'images were'} copied instead of compressed."
+        if similar:
+            summary += (
+                f"\n{len(similar)} of them only looked the same: {'its' if len(similar) == 1 else 'their'} output "
+                f"{'holds' if len(similar) == 1 else 'hold'} the pixels of a similar image"
+                f" (e.g. {os.path.basename(similar[0]['file'])} from {os.path.basename(similar[0]['pixels_from'])})."
+            )
+        if unmet:
+            summary += (
+                f"\n{len(unmet)} {'image' if len(unmet) == 1 else 'images'} could not be kept visually lossless "
+                f"even at the highest quality (e.g. {os.path.basename(unmet[0]['file'])}: SSIM {unmet[0]['ssim']:.3f})."
+            )
         messagebox.showinfo(
-            "Success",
-            f"All images compressed successfully!\n"
+            "Cancelled" if cancelled else "Success",
+            f"{summary}\n"
             f"Total space saved: {(total_original - total_compressed) / (1024 * 1024):.2f} MB"
         )
         
@@ -289,56 +495,74 @@ class MainTab(ttk.Frame):
             messagebox.showwarning("Warning", f"Error saving compression stats: {str(e)}")
         
     def create_preview(self, event):
-        widget = event.widget
-        index = widget.nearest(event.y)
-    
-        bbox = widget.bbox(index)
-        if not bbox:
+        index = self.file_list.index_at(event.y)
+        if index is None:
             self.hide_preview()
             return
         
-        if not (bbox[1] <= event.y <= bbox[1] + bbox[3]):
-            self.hide_preview()
+        bbox = self.file_list.row_bbox(index)
+        file_path = self.shared_data['selected_files'][index]
+        if file_path == self._hover_path:
+            return
+        
+        self.hide_preview()
+        self._hover_path = file_path
+        self._hover_y = bbox[1]
+        self._preview_polls = 0
+        self.prefetch_thumbnails()
+        
+        image = self.thumbnails.request(file_path)
+        if image is not None:
+            self.show_preview(image)
+        elif self._preview_poll is None:
+            self._preview_poll = self.after(self.PREVIEW_POLL_MS, self.poll_preview)
+            
+    def poll_preview(self):
+        self._preview_poll = None
+        if self._hover_path is None or self.preview_window:
             return
         
+        image = self.thumbnails.get(self._hover_path)
+        if image is not None:
+            self.show_preview(image)
+            return
+        
+        self._preview_polls += 1
+        if self._preview_polls < self.PREVIEW_MAX_POLLS:
+            self._preview_poll = self.after(self.PREVIEW_POLL_MS, self.poll_preview)
+            
+    def show_preview(self, image):
         try:
-            file_path = self.shared_data['selected_files'][index]
+            self.preview_window = tk.Toplevel()
+            self.preview_window.overrideredirect(True)
+            self.preview_window.withdraw()
+            
+            photo = ImageTk.PhotoImage(image)
+            
+            label = tk.Label(self.preview_window, image=photo, bd=2, relief="solid")
+            label.image = photo
+            label.pack()
+            
+            x = self.winfo_rootx() + self.files_listbox.winfo_width() + 10
+            y = self.winfo_rooty() + self._hover_y
+            self.preview_window.geometry(f"+{x}+{y}")
+            self.preview_window.attributes('-alpha', 0.95)
+            self.preview_window.deiconify()
             
-            if (self.preview_window is None or 
-                getattr(self, '_current_preview_path', None) != file_path):
-                
-                if self.preview_window:
-                    self.preview_window.destroy()
-                    
-                self.preview_window = tk.Toplevel()
-                self.preview_window.overrideredirect(True)
-                self.preview_window.withdraw()
-                
-                image = Image.open(file_path)
-                preview_size = (200, 200)
-                image.thumbnail(preview_size, Image.Resampling.LANCZOS)
-                
-                photo = ImageTk.PhotoImage(image)
-                
-                label = tk.Label(self.preview_window, image=photo, bd=2, relief="solid")
-                label.image = photo
-                label.pack()
-                
-                x = self.winfo_rootx() + widget.winfo_width() + 10
-                y = self.winfo_rooty() + bbox[1]
-                self.preview_window.geometry(f"+{x}+{y}")
-                self.preview_window.attributes('-alpha', 0.95)
-                self.preview_window.deiconify()
-                
-                self._current_preview_path = file_path
-                
         except Exception as e:
             if self.preview_window:
                 self.preview_window.destroy()
                 self.preview_window = None
-                self._current_preview_path = None
+                
+    def prefetch_thumbnails(self):
+        files = self.shared_data['selected_files']
+        first, last = self.file_list.visible_range()
+        start = max(0, first - self.PREFETCH_MARGIN)
+        end = min(len(files), last + self.PREFETCH_MARGIN)
+        self.thumbnails.prefetch(files[start:end])
     
     def hide_preview(self, event=None):
+        self._hover_path = None
         if self.preview_window:
             self.preview_window.destroy()
             self.preview_window = None
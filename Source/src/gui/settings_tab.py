@@ -1,3 +1,4 @@
+import os
 import tkinter as tk
 from tkinter import ttk, filedialog
 
@@ -11,7 +12,9 @@ class SettingsTab(ttk.Frame):
         self.setup_quality_frame()
         self.setup_format_frame()
         self.setup_target_size_frame()
+        self.setup_resize_frame()
         self.setup_output_frame()
+        self.setup_performance_frame()
         
     def setup_quality_frame(self):
         quality_frame = ttk.LabelFrame(self, text="Compression Quality")
@@ -20,7 +23,8 @@ class SettingsTab(ttk.Frame):
         qualities = [
             ("High Quality", "high"),
             ("Medium Quality", "medium"),
-            ("Low Quality", "low")
+            ("Low Quality", "low"),
+            ("Visually Lossless", "perceptual")
         ]
         
         for text, value in qualities:
@@ -38,7 +42,9 @@ class SettingsTab(ttk.Frame):
         formats = [
             ("Keep Original", "same"),
             ("Convert to JPEG", "JPEG"),
-            ("Convert to PNG", "PNG")
+            ("Convert to PNG", "PNG"),
+            ("Convert to WebP", "WEBP"),
+            ("Smallest of JPEG, WebP and PNG", "smallest")
         ]
         
         for text, value in formats:
@@ -49,6 +55,12 @@ class SettingsTab(ttk.Frame):
                 value=value
             ).pack(anchor='w', padx=10, pady=2)
             
+        ttk.Checkbutton(
+            format_frame,
+            text="Reduce PNG colours to a 256-colour palette (lossy)",
+            variable=self.shared_data['quantize_png']
+        ).pack(anchor='w', padx=10, pady=2)
+            
     def setup_target_size_frame(self):
         target_frame = ttk.LabelFrame(self, text="Target Size")
         target_frame.pack(fill='x', padx=10, pady=5)
@@ -72,6 +84,44 @@ class SettingsTab(ttk.Frame):
         )
         self.target_size_entry.pack(side=tk.LEFT, padx=5)
         
+        self.target_mode_buttons = []
+        for text, value in [("Per image", "file"), ("Whole batch", "batch")]:
+            button = ttk.Radiobutton(
+                target_frame,
+                text=text,
+                variable=self.shared_data['target_mode'],
+                value=value,
+                state=tk.DISABLED
+            )
+            button.pack(anchor='w', padx=10, pady=2)
+            self.target_mode_buttons.append(button)
+        
+    def setup_resize_frame(self):
+        resize_frame = ttk.LabelFrame(self, text="Resize")
+        resize_frame.pack(fill='x', padx=10, pady=5)
+        
+        dimension_frame = ttk.Frame(resize_frame)
+        dimension_frame.pack(fill='x', padx=10, pady=2)
+        
+        ttk.Label(dimension_frame, text="Max Long Edge (px):").pack(side=tk.LEFT)
+        ttk.Entry(
+            dimension_frame,
+            textvariable=self.shared_data['max_dimension'],
+            width=10
+        ).pack(side=tk.LEFT, padx=5)
+        
+        scale_frame = ttk.Frame(resize_frame)
+        scale_frame.pack(fill='x', padx=10, pady=2)
+        
+        ttk.Label(scale_frame, text="Scale (%):").pack(side=tk.LEFT)
+        ttk.Spinbox(
+            scale_frame,
+            from_=1,
+            to=100,
+            textvariable=self.shared_data['scale_percent'],
+            width=5
+        ).pack(side=tk.LEFT, padx=5)
+        
     def setup_output_frame(self):
         output_frame = ttk.LabelFrame(self, text="Output Directory")
         output_frame.pack(fill='x', padx=10, pady=5)
@@ -88,11 +138,58 @@ class SettingsTab(ttk.Frame):
         )
         self.output_label.pack(padx=10, pady=5)
         
+        ttk.Checkbutton(
+            output_frame,
+            text="Replace existing compressed files",
+            variable=self.shared_data['overwrite']
+        ).pack(anchor='w', padx=10, pady=2)
+        
+    def setup_performance_frame(self):
+        performance_frame = ttk.LabelFrame(self, text="Performance")
+        performance_frame.pack(fill='x', padx=10, pady=5)
+        
+        workers_frame = ttk.Frame(performance_frame)
+        workers_frame.pack(fill='x', padx=10, pady=2)
+        
+        ttk.Label(workers_frame, text="Worker Processes:").pack(side=tk.LEFT)
+        ttk.Spinbox(
+            workers_frame,
+            from_=1,
+            to=os.cpu_count() or 1,
+            textvariable=self.shared_data['workers'],
+            width=5
+        ).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Checkbutton(
+            performance_frame,
+            text="Reuse results for unchanged images",
+            variable=self.shared_data['use_cache']
+        ).pack(anchor='w', padx=10, pady=2)
+        
+        ttk.Checkbutton(
+            performance_frame,
+            text="Compress duplicate images once",
+            variable=self.shared_data['skip_duplicates'],
+            command=self.toggle_duplicates
+        ).pack(anchor='w', padx=10, pady=2)
+        
+        self.similar_button = ttk.Checkbutton(
+            performance_frame,
+            text="Also match re-saved copies (they get the first copy's output)",
+            variable=self.shared_data['match_similar'],
+            state=tk.DISABLED
+        )
+        self.similar_button.pack(anchor='w', padx=30, pady=2)
+        
+    def toggle_duplicates(self):
+        state = tk.NORMAL if self.shared_data['skip_duplicates'].get() else tk.DISABLED
+        self.similar_button.config(state=state)
+        
     def toggle_target_size(self):
-        if self.shared_data['use_target_size'].get():
-            self.target_size_entry.config(state=tk.NORMAL)
-        else:
-            self.target_size_entry.config(state=tk.DISABLED)
+        state = tk.NORMAL if self.shared_data['use_target_size'].get() else tk.DISABLED
+        self.target_size_entry.config(state=state)
+        for button in self.target_mode_buttons:
+            button.config(state=state)
             
     def select_output_folder(self):
         folder_path = filedialog.askdirectory()
@@ -1,5 +1,6 @@
 import os
 import sys
+import multiprocessing
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 src_dir = os.path.dirname(current_dir)
@@ -18,4 +19,5 @@ def main():
         messagebox.showerror("Error", f"Application error: {str(e)}")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
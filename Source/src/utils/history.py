@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, Iterator, Optional
+
+
+class HistoryStore:
+    BATCH_SIZE = 10000
+    COLUMNS = (
+        'batch_id', 'created_at', 'file', 'output_path', 'format',
+        'original_size', 'compressed_size', 'savings', 'savings_ratio'
+    )
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or HistoryStore.default_path()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        self._db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS compressions (
+                id INTEGER PRIMARY KEY,
+                batch_id INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                file TEXT NOT NULL,
+                output_path TEXT,
+                format TEXT,
+                original_size INTEGER NOT NULL,
+                compressed_size INTEGER NOT NULL,
+                savings INTEGER NOT NULL,
+                savings_ratio REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS compressions_created_at ON compressions (created_at);
+            CREATE INDEX IF NOT EXISTS compressions_file ON compressions (file);
+            CREATE INDEX IF NOT EXISTS compressions_format ON compressions (format, created_at);
+            CREATE INDEX IF NOT EXISTS compressions_savings ON compressions (savings_ratio);
+            CREATE INDEX IF NOT EXISTS compressions_batch ON compressions (batch_id);
+        """)
+
+    @staticmethod
+    def default_path() -> str:
+        if os.name == 'nt':
+            base = os.environ.get('APPDATA') or os.path.expanduser('~')
+            return os.path.join(base, "QuickPress", "history.sqlite3")
+        base = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), ".local", "share")
+        return os.path.join(base, "quickpress", "history.sqlite3")
+
+    def add(self, stats: Iterable[Dict], created_at: Optional[float] = None) -> int:
+        created_at = created_at or time.time()
+        batch_id = int(created_at * 1000)
+        placeholders = ", ".join("?" for _ in HistoryStore.COLUMNS)
+        sql = f"INSERT INTO compressions ({', '.join(HistoryStore.COLUMNS)}) VALUES ({placeholders})"
+
+        rows = []
+        count = 0
+        for stat in stats:
+            original_size = stat['original_size']
+            savings = original_size - stat['compressed_size']
+            rows.append((
+                batch_id, created_at, os.path.abspath(stat['file']), stat.get('output_path'),
+                stat.get('format'), original_size, stat['compressed_size'], savings,
+                savings / original_size if original_size else 0.0
+            ))
+            if len(rows) >= HistoryStore.BATCH_SIZE:
+                count += self._insert(sql, rows)
+                rows = []
+        if rows:
+            count += self._insert(sql, rows)
+        return count
+
+    def _insert(self, sql: str, rows: list) -> int:
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.executemany(sql, rows)
+        return len(rows)
+
+    def query(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        path_prefix: Optional[str] = None,
+        output_format: Optional[str] = None,
+        min_savings_ratio: Optional[float] = None,
+        limit: Optional[int] = None,
+        newest_first: bool = True
+    ) -> Iterator[Dict]:
+        conditions = []
+        params = []
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("created_at < ?")
+            params.append(until)
+        if path_prefix:
+            # A range scan keeps the prefix match on the file index, unlike LIKE
+            prefix = os.path.abspath(path_prefix)
+            conditions.append("file >= ? AND file < ?")
+            params.extend([prefix, prefix + "\uffff"])
+        if output_format:
+            conditions.append("format = ?")
+            params.append(output_format)
+        if min_savings_ratio is not None:
+            conditions.append("savings_ratio >= ?")
+            params.append(min_savings_ratio)
+
+        sql = f"SELECT {', '.join(HistoryStore.COLUMNS)} FROM compressions"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY created_at {'DESC' if newest_first else 'ASC'}"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        for row in self._db.execute(sql, params):
+            yield dict(row)
+
+    def summary(self, since: Optional[float] = None) -> Dict:
+        sql = (
+            "SELECT COUNT(*) AS files, COALESCE(SUM(original_size), 0) AS original_size, "
+            "COALESCE(SUM(compressed_size), 0) AS compressed_size FROM compressions"
+        )
+        params = []
+        if since is not None:
+            sql += " WHERE created_at >= ?"
+            params.append(since)
+        return dict(self._db.execute(sql, params).fetchone())
+
+    def close(self) -> None:
+        self._db.close()
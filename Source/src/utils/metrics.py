@@ -0,0 +1,157 @@
+import json
+import threading
+from typing import Callable, Dict, List
+
+
+class _Histogram:
+    __slots__ = ('counts', 'count', 'total', 'minimum', 'maximum')
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+
+class MetricsRegistry:
+    # Latency bucket upper bounds in milliseconds; one extra bucket holds anything slower
+    LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._histograms: Dict[str, _Histogram] = {}
+        self._hooks: List[Callable[[Dict], None]] = []
+
+    def add_hook(self, hook: Callable[[Dict], None]) -> None:
+        # Hooks receive every recorded stat dict, on whichever thread finished the file
+        with self._lock:
+            self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[Dict], None]) -> None:
+        with self._lock:
+            if hook in self._hooks:
+                self._hooks.remove(hook)
+
+    def increment(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name: str, value_ms: float) -> None:
+        with self._lock:
+            self._observe(name, value_ms)
+
+    def _observe(self, name: str, value_ms: float) -> None:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = _Histogram(len(MetricsRegistry.LATENCY_BUCKETS_MS) + 1)
+
+        bucket = len(MetricsRegistry.LATENCY_BUCKETS_MS)
+        for index, bound in enumerate(MetricsRegistry.LATENCY_BUCKETS_MS):
+            if value_ms <= bound:
+                bucket = index
+                break
+        histogram.counts[bucket] += 1
+        histogram.count += 1
+        histogram.total += value_ms
+        histogram.minimum = value_ms if histogram.minimum is None else min(histogram.minimum, value_ms)
+        histogram.maximum = value_ms if histogram.maximum is None else max(histogram.maximum, value_ms)
+
+    def record(self, stat: Dict) -> None:
+        with self._lock:
+            counters = self._counters
+            counters['files'] = counters.get('files', 0) + 1
+            if 'error' in stat:
+                counters['errors'] = counters.get('errors', 0) + 1
+            else:
+                if stat.get('cached'):
+                    counters['cached'] = counters.get('cached', 0) + 1
+                if stat.get('duplicate_of'):
+                    counters['duplicates'] = counters.get('duplicates', 0) + 1
+                if stat.get('ssim_met') is False:
+                    counters['ssim_unmet'] = counters.get('ssim_unmet', 0) + 1
+                counters['bytes_in'] = counters.get('bytes_in', 0) + stat.get('original_size', 0)
+                counters['bytes_out'] = counters.get('bytes_out', 0) + stat.get('compressed_size', 0)
+                for name in ('search_iterations', 'proxy_encodes'):
+                    if name in stat:
+                        counters[name] = counters.get(name, 0) + stat[name]
+
+            for stage, value_ms in stat.get('timings', {}).items():
+                self._observe(stage, value_ms)
+            hooks = list(self._hooks)
+
+        for hook in hooks:
+            try:
+                hook(stat)
+            except Exception:
+                pass
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            histograms = {}
+            for name, histogram in self._histograms.items():
+                bounds = list(MetricsRegistry.LATENCY_BUCKETS_MS) + [None]
+                histograms[name] = {
+                    'count': histogram.count,
+                    'sum_ms': histogram.total,
+                    'mean_ms': histogram.total / histogram.count,
+                    'min_ms': histogram.minimum,
+                    'max_ms': histogram.maximum,
+                    'p50_ms': self._quantile(histogram, 0.5),
+                    'p95_ms': self._quantile(histogram, 0.95),
+                    'p99_ms': self._quantile(histogram, 0.99),
+                    'buckets': [
+                        {'le_ms': bound, 'count': count}
+                        for bound, count in zip(bounds, histogram.counts)
+                    ]
+                }
+            return {'counters': dict(self._counters), 'histograms': histograms}
+
+    @staticmethod
+    def _quantile(histogram: _Histogram, quantile: float) -> float:
+        # Upper bound of the bucket holding the quantile, clamped to what was actually seen
+        rank = quantile * histogram.count
+        seen = 0
+        for index, count in enumerate(histogram.counts):
+            seen += count
+            if seen >= rank and count:
+                if index < len(MetricsRegistry.LATENCY_BUCKETS_MS):
+                    return min(MetricsRegistry.LATENCY_BUCKETS_MS[index], histogram.maximum)
+                break
+        return histogram.maximum
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+    def dump(self, filepath: str) -> None:
+        try:
+            snapshot = self.snapshot()
+            with open(filepath, 'w') as f:
+                if filepath.lower().endswith('.prom'):
+                    f.write(MetricsRegistry.to_prometheus(snapshot))
+                else:
+                    json.dump(snapshot, f, indent=2)
+        except Exception as e:
+            raise Exception(f"Error writing metrics: {str(e)}")
+
+    @staticmethod
+    def to_prometheus(snapshot: Dict, prefix: str = "quickpress") -> str:
+        lines = []
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+
+        metric = f"{prefix}_stage_duration_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        for stage, histogram in sorted(snapshot['histograms'].items()):
+            cumulative = 0
+            for bucket in histogram['buckets']:
+                cumulative += bucket['count']
+                bound = "+Inf" if bucket['le_ms'] is None else f"{bucket['le_ms'] / 1000:g}"
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {histogram["sum_ms"] / 1000}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {histogram["count"]}')
+        return "\n".join(lines) + "\n"
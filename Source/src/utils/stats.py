@@ -1,42 +1,141 @@
-import pandas as pd
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-import json
+import csv
+import gzip
 import os
-from typing import List, Dict
-import matplotlib.pyplot as plt
-import numpy as np
-from tkinter import Frame, Canvas
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.utils.history import HistoryStore
 
 class StatsManager:
+    CHART_TOP_N = 30
+    CHART_HISTOGRAM_BINS = 20
+    # Charts are drawn on one reused Agg figure; the lock serialises renders
+    _figure = None
+    _figure_lock = threading.Lock()
+    CSV_COLUMNS = [
+        'file', 'original_size', 'compressed_size', 'format', 'output_path', 'quality', 'ssim', 'ssim_met',
+        'duplicate_group', 'duplicate_of', 'duplicate', 'pixels_from'
+    ]
+    PDF_MARGIN = 30
+    PDF_LINE_HEIGHT = 14
+    PDF_NAME_CHARS = 48
+    # Column titles and their x positions on a letter page
+    PDF_COLUMNS = [
+        ("File", 30),
+        ("Original (MB)", 320),
+        ("Compressed (MB)", 400),
+        ("Saved", 490),
+        ("Format", 540)
+    ]
+    
     @staticmethod
-    def export_to_csv(stats: List[Dict], filepath: str) -> None:
+    def export_to_csv(stats: Iterable[Dict], filepath: str, compress: Optional[bool] = None) -> None:
         try:
-            df = pd.DataFrame(stats)
-            df.to_csv(filepath, index=False)
+            if compress is None:
+                compress = filepath.lower().endswith('.gz')
+            opener = gzip.open if compress else open
+            
+            with opener(filepath, 'wt', newline='', encoding='utf-8') as f:
+                writer = None
+                for stat in stats:
+                    if writer is None:
+                        columns = StatsManager.CSV_COLUMNS + [key for key in stat if key not in StatsManager.CSV_COLUMNS]
+                        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+                        writer.writeheader()
+                    writer.writerow(stat)
+                    
+                if writer is None:
+                    csv.writer(f).writerow(StatsManager.CSV_COLUMNS)
         except Exception as e:
             raise Exception(f"Error exporting to CSV: {str(e)}")
     
     @staticmethod
-    def export_to_pdf(stats: List[Dict], filepath: str) -> None:
+    def export_to_pdf(stats: Iterable[Dict], filepath: str) -> None:
         try:
-            c = canvas.Canvas(filepath, pagesize=letter)
+            from reportlab.lib.pagesizes import letter
+            from reportlab.pdfgen import canvas
+            
+            c = canvas.Canvas(filepath, pagesize=letter, pageCompression=1)
             width, height = letter
-            c.drawString(30, height - 30, "Compression Statistics")
+            margin = StatsManager.PDF_MARGIN
+            line_height = StatsManager.PDF_LINE_HEIGHT
+            page = 1
+            
+            def start_page() -> float:
+                c.setFont("Helvetica-Bold", 12)
+                c.drawString(margin, height - margin, "Compression Statistics")
+                c.setFont("Helvetica-Bold", 9)
+                for title, x in StatsManager.PDF_COLUMNS:
+                    c.drawString(x, height - margin - 20, title)
+                c.setFont("Helvetica", 9)
+                return height - margin - 20 - line_height
+            
+            def finish_page() -> None:
+                c.setFont("Helvetica", 8)
+                c.drawRightString(width - margin, margin / 2, f"Page {page}")
+                
+            y = start_page()
+            files = 0
+            duplicates = 0
+            similar = 0
+            total_original = 0
+            total_compressed = 0
             
-            y = height - 50
             for stat in stats:
-                text = (
-                    f"File: {os.path.basename(stat['file'])}\n"
-                    f"Original Size: {stat['original_size'] / (1024 * 1024):.2f} MB\n"
-                    f"Compressed Size: {stat['compressed_size'] / (1024 * 1024):.2f} MB\n"
-                    f"Format: {stat['format']}\n"
+                if y < margin:
+                    finish_page()
+                    c.showPage()
+                    page += 1
+                    y = start_page()
+                    
+                name = os.path.basename(stat['file'])
+                if len(name) > StatsManager.PDF_NAME_CHARS:
+                    name = name[:StatsManager.PDF_NAME_CHARS - 3] + "..."
+                original_size = stat['original_size']
+                compressed_size = stat['compressed_size']
+                saved = (original_size - compressed_size) / original_size * 100 if original_size else 0
+                
+                values = [
+                    name,
+                    f"{original_size / (1024 * 1024):.2f}",
+                    f"{compressed_size / (1024 * 1024):.2f}",
+                    f"{saved:.1f}%",
+                    f"{stat['format']} ({'near' if stat.get('pixels_from') else 'dup'})"
+                    if stat.get('duplicate_of') else str(stat['format'])
+                ]
+                for (_, x), value in zip(StatsManager.PDF_COLUMNS, values):
+                    c.drawString(x, y, value)
+                y -= line_height
+                
+                files += 1
+                duplicates += 1 if stat.get('duplicate_of') else 0
+                similar += 1 if stat.get('pixels_from') else 0
+                total_original += original_size
+                total_compressed += compressed_size
+                
+            if y < margin + line_height * (2 if similar else 1):
+                finish_page()
+                c.showPage()
+                page += 1
+                y = start_page()
+            c.setFont("Helvetica-Bold", 9)
+            c.drawString(
+                margin,
+                y - line_height / 2,
+                f"Total: {files} {'file' if files == 1 else 'files'}"
+                f"{f' ({duplicates} copied duplicates)' if duplicates else ''}, "
+                f"{total_original / (1024 * 1024):.2f} MB -> {total_compressed / (1024 * 1024):.2f} MB"
+            )
+            if similar:
+                y -= line_height
+                c.setFont("Helvetica", 9)
+                c.drawString(
+                    margin,
+                    y - line_height / 2,
+                    f"{similar} near {'duplicate holds' if similar == 1 else 'duplicates hold'} a similar image's "
+                    f"output (\"near\"), not {'its' if similar == 1 else 'their'} own pixels"
                 )
-                for line in text.split('\n'):
-                    c.drawString(30, y, line)
-                    y -= 15
-                y -= 10
+            finish_page()
             
             c.save()
         except Exception as e:
@@ -45,46 +144,115 @@ class StatsManager:
     @staticmethod
     def save_compression_stats(stats: List[Dict]) -> None:
         try:
-            with open("compression_history.json", "a") as f:
-                json.dump(stats, f)
-                f.write("\n")
+            store = HistoryStore()
+            try:
+                store.add(stats)
+            finally:
+                store.close()
         except Exception as e:
             raise Exception(f"Error saving compression stats: {str(e)}")
     
     @staticmethod
-    def create_statistics_plots(stats: List[Dict], frame: Frame) -> Canvas:
+    def render_statistics(stats: List[Dict], mode: str = "auto", size: Tuple[int, int] = (800, 800), dpi: int = 100):
         try:
-            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(8, 8))
-            fig.set_facecolor('#f0f0f0')
-            
-            file_names = [os.path.basename(stat['file']) for stat in stats]
-            original_sizes = [stat['original_size'] / (1024 * 1024) for stat in stats]
-            compressed_sizes = [stat['compressed_size'] / (1024 * 1024) for stat in stats]
-            
-            x = np.arange(len(file_names))
-            width = 0.35
-            
-            ax1.bar(x - width/2, original_sizes, width, label='Original Size', color='#2196F3')
-            ax1.bar(x + width/2, compressed_sizes, width, label='Compressed Size', color='#4CAF50')
-            ax1.set_ylabel('Size (MB)')
-            ax1.set_title('File Sizes Before and After Compression')
-            ax1.set_xticks(x)
-            ax1.set_xticklabels(file_names, rotation=45, ha='right')
-            ax1.legend()
+            import numpy as np
+            from PIL import Image
             
-            compression_ratios = [(stat['original_size'] - stat['compressed_size']) / stat['original_size'] * 100 
-                                for stat in stats]
-            ax2.bar(x, compression_ratios, color='#FF9800')
-            ax2.set_ylabel('Compression Ratio (%)')
-            ax2.set_title('Compression Ratio by File')
-            ax2.set_xticks(x)
-            ax2.set_xticklabels(file_names, rotation=45, ha='right')
-            
-            plt.tight_layout()
-            
-            canvas = FigureCanvasTkAgg(fig, master=frame)
-            canvas.draw()
-            
-            return canvas.get_tk_widget()
+            with StatsManager._figure_lock:
+                if StatsManager._figure is None:
+                    from matplotlib.backends.backend_agg import FigureCanvasAgg
+                    from matplotlib.figure import Figure
+                    
+                    StatsManager._figure = Figure(dpi=dpi)
+                    FigureCanvasAgg(StatsManager._figure)
+                fig = StatsManager._figure
+                fig.clf()
+                fig.set_dpi(dpi)
+                fig.set_size_inches(size[0] / dpi, size[1] / dpi)
+                fig.set_facecolor('#f0f0f0')
+                
+                original = np.fromiter((stat['original_size'] for stat in stats), dtype=np.float64, count=len(stats))
+                compressed = np.fromiter((stat['compressed_size'] for stat in stats), dtype=np.float64, count=len(stats))
+                ratios = np.divide(
+                    original - compressed, original,
+                    out=np.zeros_like(original), where=original > 0
+                ) * 100
+                
+                if mode == "auto":
+                    mode = "files" if len(stats) <= StatsManager.CHART_TOP_N else "aggregate"
+                
+                if mode == "histogram":
+                    StatsManager._plot_ratio_histogram(fig.add_subplot(1, 1, 1), ratios)
+                elif mode == "formats":
+                    StatsManager._plot_format_totals(fig.add_subplot(1, 1, 1), stats, original, compressed)
+                elif mode == "aggregate":
+                    StatsManager._plot_ratio_histogram(fig.add_subplot(2, 1, 1), ratios)
+                    StatsManager._plot_format_totals(fig.add_subplot(2, 1, 2), stats, original, compressed)
+                else:
+                    if len(stats) > StatsManager.CHART_TOP_N:
+                        # Keep the files that saved the most bytes, in their original order
+                        top = np.argpartition(compressed - original, StatsManager.CHART_TOP_N)[:StatsManager.CHART_TOP_N]
+                        indices = np.sort(top)
+                        title = f"Top {StatsManager.CHART_TOP_N} of {len(stats)} Files by Space Saved"
+                    else:
+                        indices = np.arange(len(stats))
+                        title = "File Sizes Before and After Compression"
+                    StatsManager._plot_files(
+                        fig.add_subplot(2, 1, 1), fig.add_subplot(2, 1, 2),
+                        [os.path.basename(stats[i]['file']) for i in indices],
+                        original[indices], compressed[indices], ratios[indices], title
+                    )
+                    
+                fig.tight_layout()
+                fig.canvas.draw()
+                width, height = fig.canvas.get_width_height()
+                return Image.frombuffer('RGBA', (width, height), fig.canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1).copy()
         except Exception as e:
-            raise Exception(f"Error creating statistics plots: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error creating statistics plots: {str(e)}")
+    
+    @staticmethod
+    def _plot_files(ax1, ax2, file_names, original, compressed, ratios, title: str) -> None:
+        import numpy as np
+        
+        x = np.arange(len(file_names))
+        width = 0.35
+        
+        ax1.bar(x - width/2, original / (1024 * 1024), width, label='Original Size', color='#2196F3')
+        ax1.bar(x + width/2, compressed / (1024 * 1024), width, label='Compressed Size', color='#4CAF50')
+        ax1.set_ylabel('Size (MB)')
+        ax1.set_title(title)
+        ax1.set_xticks(x)
+        ax1.set_xticklabels(file_names, rotation=45, ha='right')
+        ax1.legend()
+        
+        ax2.bar(x, ratios, color='#FF9800')
+        ax2.set_ylabel('Compression Ratio (%)')
+        ax2.set_title('Compression Ratio by File')
+        ax2.set_xticks(x)
+        ax2.set_xticklabels(file_names, rotation=45, ha='right')
+    
+    @staticmethod
+    def _plot_ratio_histogram(ax, ratios) -> None:
+        ax.hist(ratios, bins=StatsManager.CHART_HISTOGRAM_BINS, color='#FF9800', edgecolor='#f0f0f0')
+        ax.set_xlabel('Compression Ratio (%)')
+        ax.set_ylabel('Files')
+        ax.set_title(f'Compression Ratio Distribution ({len(ratios)} Files)')
+    
+    @staticmethod
+    def _plot_format_totals(ax, stats: List[Dict], original, compressed) -> None:
+        import numpy as np
+        
+        formats = np.array([str(stat['format']) for stat in stats])
+        names, codes = np.unique(formats, return_inverse=True)
+        original_totals = np.bincount(codes, weights=original, minlength=len(names)) / (1024 * 1024)
+        compressed_totals = np.bincount(codes, weights=compressed, minlength=len(names)) / (1024 * 1024)
+        
+        x = np.arange(len(names))
+        width = 0.35
+        ax.bar(x - width/2, original_totals, width, label='Original Size', color='#2196F3')
+        ax.bar(x + width/2, compressed_totals, width, label='Compressed Size', color='#4CAF50')
+        ax.set_ylabel('Size (MB)')
+        ax.set_title('Total Size by Output Format')
+        ax.set_xticks(x)
+        ax.set_xticklabels(names)
+        ax.legend()
@@ -0,0 +1,163 @@
+import hashlib
+import itertools
+import os
+import queue
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from PIL import Image
+
+from src.core.compressor import ImageCompressor
+
+
+class ThumbnailCache:
+    # get() and request() run on the Tk thread, so they only look up the path in
+    # memory; workers stat the file and replace thumbnails whose file changed
+    DEFAULT_SIZE = (200, 200)
+    DEFAULT_CAPACITY = 256
+    DEFAULT_WORKERS = 2
+    MAX_DISK_ENTRIES = 5000
+    PRUNE_EVERY = 100
+    # Hover requests jump ahead of any queued prefetches
+    PRIORITY_REQUEST = 0
+    PRIORITY_PREFETCH = 1
+
+    def __init__(
+        self,
+        size: Tuple[int, int] = DEFAULT_SIZE,
+        capacity: int = DEFAULT_CAPACITY,
+        disk_dir: Optional[str] = None,
+        workers: int = DEFAULT_WORKERS
+    ):
+        self.size = size
+        self.capacity = capacity
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+        self._images: "OrderedDict[str, Tuple[Tuple, Image.Image]]" = OrderedDict()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._disk_writes = 0
+
+        for _ in range(max(1, workers)):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def get(self, file_path: str) -> Optional[Image.Image]:
+        with self._lock:
+            entry = self._images.get(file_path)
+            if entry is None:
+                return None
+            self._images.move_to_end(file_path)
+            return entry[1]
+
+    def request(self, file_path: str) -> Optional[Image.Image]:
+        # A hit is shown at once and revalidated in the background
+        image = self.get(file_path)
+        self._schedule(file_path, ThumbnailCache.PRIORITY_REQUEST)
+        return image
+
+    def prefetch(self, file_paths: Iterable[str]) -> None:
+        for file_path in file_paths:
+            self._schedule(file_path, ThumbnailCache.PRIORITY_PREFETCH)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._images.clear()
+
+    def _key(self, file_path: str) -> Optional[Tuple]:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return (file_path, stat.st_mtime_ns, stat.st_size)
+
+    def _schedule(self, file_path: str, priority: int) -> None:
+        with self._lock:
+            if file_path in self._pending:
+                if priority == ThumbnailCache.PRIORITY_PREFETCH:
+                    return
+            else:
+                self._pending.add(file_path)
+        self._queue.put((priority, next(self._order), file_path))
+
+    def _work(self) -> None:
+        while True:
+            _, _, file_path = self._queue.get()
+            try:
+                key = self._key(file_path)
+                if key is None:
+                    with self._lock:
+                        self._images.pop(file_path, None)
+                    continue
+                with self._lock:
+                    entry = self._images.get(file_path)
+                    if entry is not None and entry[0] == key:
+                        continue
+                image = self._load(key)
+                with self._lock:
+                    self._images[file_path] = (key, image)
+                    self._images.move_to_end(file_path)
+                    while len(self._images) > self.capacity:
+                        self._images.popitem(last=False)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._pending.discard(file_path)
+
+    def _load(self, key: Tuple) -> Image.Image:
+        disk_path = self._disk_path(key)
+        if disk_path and os.path.exists(disk_path):
+            try:
+                with Image.open(disk_path) as cached:
+                    cached.load()
+                    image = cached.copy()
+                # Pruning drops the oldest mtimes, so touching hits makes the disk tier LRU
+                os.utime(disk_path)
+                return image
+            except Exception:
+                pass
+
+        with ImageCompressor.open_image(key[0], self.size) as img:
+            img.thumbnail(self.size, Image.Resampling.LANCZOS)
+            image = img.convert('RGBA' if 'A' in img.getbands() or img.mode == 'P' else 'RGB')
+
+        if disk_path:
+            self._store(disk_path, image)
+        return image
+
+    def _disk_path(self, key: Tuple) -> Optional[str]:
+        if not self.disk_dir:
+            return None
+        name = hashlib.sha1(repr(key + (self.size,)).encode()).hexdigest()
+        return os.path.join(self.disk_dir, f"{name}.png")
+
+    def _store(self, disk_path: str, image: Image.Image) -> None:
+        temp_path = f"{disk_path}.{threading.get_ident()}.tmp"
+        try:
+            image.save(temp_path, format="PNG")
+            os.replace(temp_path, disk_path)
+        except OSError:
+            return
+
+        with self._lock:
+            self._disk_writes += 1
+            prune = self._disk_writes % ThumbnailCache.PRUNE_EVERY == 0
+        if prune:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        try:
+            entries = [entry for entry in os.scandir(self.disk_dir) if entry.name.endswith(".png")]
+            if len(entries) <= ThumbnailCache.MAX_DISK_ENTRIES:
+                return
+            # Least recently used first: hits and writes both refresh the mtime
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:len(entries) - ThumbnailCache.MAX_DISK_ENTRIES]:
+                os.remove(entry.path)
+        except OSError:
+            pass